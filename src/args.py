@@ -1,4 +1,3 @@
-
 def get_shift_req_args(parser):
     parser.add_argument(
         "--start_date", type=str, help="shift start date(inclusive), format: mm/dd/yy",
@@ -45,3 +44,143 @@ def get_shift_req_args(parser):
         help="overwrite existing shift matrix"
     )
     return parser
+
+
+def get_main_args(parser):
+    parser.add_argument(
+        "--data_dir", type=str, default="../data/", help="data directory"
+    )
+    parser.add_argument(
+        "--data_name", type=str, required=True,
+        help="name of the data to generate shift requirement for",
+    )
+    parser.add_argument(
+        "--date_format", type=str, help="format string for start/end date",
+        default="%m/%d/%y"
+    )
+    parser.add_argument(
+        "--inputter", type=str, default="ElmSpring2022PreferenceInputer",
+        help="name of the preference inputter class"
+    )
+    parser.add_argument(
+        "--outputter", type=str, default="ElmScheduleOutputter",
+        help="name of the schedule outputter class"
+    )
+    parser.add_argument(
+        "--raw_pref_file_name", type=str, help="name of the raw preference file",
+        required=True
+    )
+    parser.add_argument(
+        "--unavailble_day_json_file_name", type=str,
+        help="name of the json file containing unavailable days for each staff",
+    )
+    parser.add_argument(
+        "--solution_file_name", type=str, help="name of the solution file",
+        default="solution.xlsx"
+    )
+    parser.add_argument(
+        "--output_formats", type=str, nargs="+", default=["xlsx"],
+        help="formats the schedule, stats and run metadata are written to: "
+             "xlsx, csv, parquet, json and/or npy"
+    )
+    parser.add_argument(
+        "--max_solve_time", type=int, help="max time in seconds to solve schedule",
+        default=10
+    )
+    parser.add_argument(
+        "--sparse_model", action="store_true",
+        help="do not create variables for non-existing or unavailable shifts"
+    )
+    parser.add_argument(
+        "--max_consecutive_encoding", type=str, default="window",
+        choices=["window", "prefix", "automaton"],
+        help="encoding of the max consecutive days constraint"
+    )
+    parser.add_argument(
+        "--negative_pref_weight", type=int, default=5,
+        help="objective weight of the negative preferences relative to the positive ones"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="record time, memory and solver stats of each stage to the solutions directory"
+    )
+    parser.add_argument(
+        "--no_input_cache", action="store_true",
+        help="parse the raw input files without the parsed input cache"
+    )
+    parser.add_argument(
+        "--input_cache_size_mb", type=float, default=512,
+        help="max size of the parsed input cache in data_dir"
+    )
+    return parser
+
+
+def get_solver_args(parser):
+    parser.add_argument(
+        "--solver_config", type=str, default=None,
+        help="json file of CP-SAT parameters used as the solver profile, "
+             "overridden by the solver flags below"
+    )
+    parser.add_argument(
+        "--num_workers", type=int, default=None,
+        help="number of parallel CP-SAT search workers"
+    )
+    parser.add_argument(
+        "--random_seed", type=int, default=None, help="CP-SAT random seed"
+    )
+    parser.add_argument(
+        "--randomize_search", action="store_true", default=None,
+        help="randomize the CP-SAT search"
+    )
+    parser.add_argument(
+        "--linearization_level", type=int, default=None, choices=[0, 1, 2],
+        help="CP-SAT linearization level"
+    )
+    parser.add_argument(
+        "--search_branching", type=str, default=None,
+        help="CP-SAT search strategy, e.g. AUTOMATIC_SEARCH, FIXED_SEARCH, "
+             "PORTFOLIO_SEARCH"
+    )
+    parser.add_argument(
+        "--log_search_progress", action="store_true", default=None,
+        help="log the CP-SAT search progress"
+    )
+    parser.add_argument(
+        "--hint_from", type=str, default=None,
+        help="previous solution (.npy solution matrix or schedule spreadsheet) "
+             "used as the CP-SAT solution hint, relative to the solutions directory"
+    )
+    parser.add_argument(
+        "--repair_hint", action="store_true", default=None,
+        help="let CP-SAT repair the solution hint if it is infeasible"
+    )
+    parser.add_argument(
+        "--window_days", type=int, default=0,
+        help="solve the schedule as overlapping windows of this many days "
+             "(rolling horizon), 0 solves the whole schedule at once. Not with "
+             "--hint_from, --resume, --checkpoint or --num_solutions"
+    )
+    parser.add_argument(
+        "--overlap_days", type=int, default=7,
+        help="number of days each rolling horizon window is re-solved by the next one"
+    )
+    parser.add_argument(
+        "--num_solutions", type=int, default=1,
+        help="number of diverse schedules to find, each written as its own output. "
+             "--hint_from only hints the first schedule, every later one is hinted "
+             "the schedule before it. Not with --checkpoint or --resume"
+    )
+    parser.add_argument(
+        "--min_distance", type=int, default=10,
+        help="min number of different assignments between any two diverse schedules"
+    )
+    parser.add_argument(
+        "--checkpoint", action="store_true",
+        help="checkpoint every improving solution to the solutions directory"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="resume from the checkpoint with the remaining solve time, "
+             "the checkpoint solution is the solution hint (not with --hint_from)"
+    )
+    return parser
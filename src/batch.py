@@ -0,0 +1,151 @@
+import argparse, os, json, time, traceback
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from args import get_main_args, get_shift_req_args, get_solver_args
+from main import main
+
+SUMMARY_COLUMNS = [
+    "job", "data_name", "inputter", "outputter", "status", "objective", "best_bound",
+    "wall_time", "job_time", "num_workers", "want_count", "cant_count", "error", "log"
+]
+
+
+def get_main_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="schedule finding job flags")
+    get_main_args(parser)
+    get_shift_req_args(parser)
+    get_solver_args(parser)
+    return parser
+
+
+def get_job_argv(arg_dict: dict) -> list:
+    """
+    Convert a {flag: value} dict to main.py command line args. Lists are
+    passed as multiple values, True as a bare flag and False/None are
+    skipped.
+    """
+    argv = []
+    for key, value in arg_dict.items():
+        if value is None or value is False:
+            continue
+        argv.append(f"--{key}")
+        if value is True:
+            continue
+        if isinstance(value, list):
+            argv += [str(v) for v in value]
+        else:
+            argv.append(str(value))
+    return argv
+
+
+def load_manifest(manifest_url: str) -> list:
+    """
+    Load the job arg dicts of a manifest. A manifest is either a list of
+    jobs or {"defaults": {...}, "jobs": [...]}. Each job is a dict of
+    main.py flags (e.g. "data_name", "inputter", "outputter"), and its
+    optional "args" dict is merged in as well. Job values override the
+    defaults.
+    """
+    manifest = json.load(open(manifest_url))
+    if isinstance(manifest, list):
+        manifest = {"jobs": manifest}
+    job_arg_arr = []
+    for job in manifest["jobs"]:
+        arg_dict = dict(manifest.get("defaults", {}))
+        arg_dict.update({key: value for key, value in job.items() if key != "args"})
+        arg_dict.update(job.get("args", {}))
+        assert "data_name" in arg_dict, f"Job {job} has no data_name"
+        job_arg_arr.append(arg_dict)
+    return job_arg_arr
+
+
+def run_job(job_name: str, arg_dict: dict, log_url: str) -> dict:
+    """
+    Run main.py with the job args in this process, logging its output to
+    log_url, and return its results with the job time. Errors are
+    returned as an ERROR status instead of raised.
+    """
+    record = {
+        "job": job_name, "data_name": arg_dict["data_name"],
+        "inputter": arg_dict.get("inputter"), "outputter": arg_dict.get("outputter"),
+        "num_workers": arg_dict.get("num_workers"), "log": log_url
+    }
+    start_time = time.perf_counter()
+    with open(log_url, "w") as f, redirect_stdout(f), redirect_stderr(f):
+        try:
+            args = get_main_parser().parse_args(get_job_argv(arg_dict))
+            record.update({"inputter": args.inputter, "outputter": args.outputter})
+            result_dict = main(args)
+            record.update({
+                key: value for key, value in result_dict.items() if key in SUMMARY_COLUMNS
+            })
+        except (Exception, SystemExit) as e:
+            traceback.print_exc()
+            record.update({"status": "ERROR", "error": f"{type(e).__name__}: {e}"})
+    record["job_time"] = time.perf_counter() - start_time
+    return record
+
+
+def run_batch(args) -> pd.DataFrame:
+    job_arg_arr = load_manifest(args.manifest)
+    num_cores = args.num_cores if args.num_cores is not None else os.cpu_count()
+    max_parallel_jobs = args.max_parallel_jobs
+    if max_parallel_jobs is None:
+        max_parallel_jobs = min(len(job_arg_arr), num_cores)
+    max_parallel_jobs = max(1, min(max_parallel_jobs, len(job_arg_arr)))
+    # divide the cores between the parallel jobs and their CP-SAT workers
+    num_workers = max(1, num_cores // max_parallel_jobs)
+    if not os.path.exists(args.log_dir):
+        os.makedirs(args.log_dir)
+    print(f"Running {len(job_arg_arr)} jobs, {max_parallel_jobs} at a time "
+          f"with {num_workers} CP-SAT workers each")
+
+    with ProcessPoolExecutor(max_workers=max_parallel_jobs) as executor:
+        future_dict = {}
+        for job_idx, arg_dict in enumerate(job_arg_arr):
+            arg_dict.setdefault("num_workers", num_workers)
+            job_name = f"{job_idx}_{arg_dict['data_name']}"
+            log_url = os.path.join(args.log_dir, f"{job_name}.log")
+            future = executor.submit(run_job, job_name, arg_dict, log_url)
+            future_dict[future] = job_idx
+        record_dict = {}
+        for future in as_completed(future_dict):
+            record = future.result()
+            print(f" - {record['job']}: {record.get('status')} ({record['job_time']:.1f}s)")
+            record_dict[future_dict[future]] = record
+
+    summary_df = pd.DataFrame(
+        [record_dict[job_idx] for job_idx in sorted(record_dict)], columns=SUMMARY_COLUMNS
+    )
+    summary_df.to_csv(args.summary_file, index=False)
+    print(summary_df[["job", "status", "objective", "wall_time", "job_time", "cant_count"]])
+    print("Batch summary saved to {}".format(args.summary_file))
+    return summary_df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="batch schedule finding flags")
+    parser.add_argument(
+        "--manifest", type=str, required=True,
+        help="json manifest of the jobs, each a dict of main.py flags"
+    )
+    parser.add_argument(
+        "--num_cores", type=int, default=None,
+        help="number of cores shared by all jobs, default: all cores"
+    )
+    parser.add_argument(
+        "--max_parallel_jobs", type=int, default=None,
+        help="max number of jobs run at the same time, default: one per core"
+    )
+    parser.add_argument(
+        "--log_dir", type=str, default="../data/batch_logs",
+        help="directory of the per job logs"
+    )
+    parser.add_argument(
+        "--summary_file", type=str, default="../data/batch_summary.csv",
+        help="csv file of the per job summary table"
+    )
+
+    args = parser.parse_args()
+    run_batch(args)
@@ -0,0 +1,199 @@
+import argparse, os, sys, time, json, platform, subprocess
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import ortools
+from ortools.sat.python import cp_model
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from args import get_solver_args
+from benchmark.synthetic import generate_instance, save_instance, load_instance
+from data_process.utils import Calendar
+from data_process.schedule_outputters import ElmScheduleOutputter as ScheduleOutputter
+from solver.ScheduleModeler import ScheduleModeler
+from solver.utils import get_solver_parameters, get_cp_solver
+
+
+def get_environment_info() -> dict:
+    """
+    Return the versions and machine the benchmark runs on.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "ortools": ortools.__version__,
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmark_case(instance_url: str, solver_param_dict: dict,
+                       sparse: bool=False, max_consecutive_encoding: str="window") -> dict:
+    """
+    Time every stage of one instance: input parsing, model build, solve to
+    first feasible, solve to the time limit and output (verification, stats
+    and schedule table). Return the timings with the model size and the
+    solve results.
+    """
+    record = {}
+
+    # input parsing
+    start_time = time.perf_counter()
+    instance = load_instance(instance_url)
+    staff_list, shift_list = instance["staff_list"], instance["shift_list"]
+    calendar = Calendar(instance["date_list"], instance["date_format"])
+    record["input_time"] = time.perf_counter() - start_time
+    record["num_staffs"] = len(staff_list)
+    record["num_days"] = len(calendar)
+    record["num_shifts"] = len(shift_list)
+
+    # model build
+    start_time = time.perf_counter()
+    modeler = ScheduleModeler(
+        shift_mat_df=instance["shift_mat_df"], staff_list=staff_list,
+        date_format=instance["date_format"], pref_tensor=instance["pref_tensor"],
+        max_consecutive_dict=instance["max_consecutive_dict"], calendar=calendar,
+        sparse=sparse, max_consecutive_encoding=max_consecutive_encoding, verbose=False
+    )
+    model, shifts = modeler.get_model()
+    record["model_build_time"] = time.perf_counter() - start_time
+    model_proto = model.Proto()
+    record["num_variables"] = len(model_proto.variables)
+    record["num_constraints"] = len(model_proto.constraints)
+
+    # solve to first feasible
+    first_param_dict = dict(solver_param_dict)
+    first_param_dict["stop_after_first_solution"] = True
+    solver = get_cp_solver(first_param_dict)
+    start_time = time.perf_counter()
+    status = solver.Solve(model)
+    record["first_feasible_time"] = time.perf_counter() - start_time
+    record["first_feasible_status"] = solver.StatusName(status)
+    if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        record["first_feasible_objective"] = solver.ObjectiveValue()
+
+    # solve to time limit
+    solver = get_cp_solver(solver_param_dict)
+    start_time = time.perf_counter()
+    status = solver.Solve(model)
+    record["solve_time"] = time.perf_counter() - start_time
+    record["status"] = solver.StatusName(status)
+    record["num_conflicts"] = solver.NumConflicts()
+    record["num_branches"] = solver.NumBranches()
+    if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        return record
+    record["objective"] = solver.ObjectiveValue()
+    record["best_bound"] = solver.BestObjectiveBound()
+
+    # output
+    start_time = time.perf_counter()
+    outputter = ScheduleOutputter(
+        solver=solver, shift_vars=shifts, date_list=instance["date_list"],
+        staff_list=staff_list, shift_list=shift_list,
+        date_format=instance["date_format"], pref_tensor=instance["pref_tensor"],
+        calendar=calendar, max_consecutive_dict=instance["max_consecutive_dict"],
+        shift_mat=instance["shift_mat_df"][shift_list].to_numpy(),
+        unavailable_mask=instance["unavailable_mask"]
+    )
+    violation_arr = outputter.get_schedule_violations()
+    stats_df = outputter.get_schedule_stats(verbose=False)
+    outputter.get_schedule_df()
+    record["output_time"] = time.perf_counter() - start_time
+    record["num_violations"] = len(violation_arr)
+    record["cant_count"] = int(stats_df["cant_count"].sum())
+    return record
+
+
+def main(args):
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+    instance_dir = os.path.join(args.output_dir, "instances")
+    if not os.path.exists(instance_dir):
+        os.makedirs(instance_dir)
+    solver_param_dict = get_solver_parameters(args)
+
+    record_arr = []
+    for num_staffs in args.num_staffs:
+        for num_days in args.num_days:
+            for num_shifts in args.num_shifts:
+                for seed in args.seeds:
+                    instance_name = f"staff{num_staffs}_day{num_days}_shift{num_shifts}_seed{seed}"
+                    instance_url = os.path.join(instance_dir, f"{instance_name}.npz")
+                    if not os.path.isfile(instance_url):
+                        save_instance(instance_url, generate_instance(
+                            num_staffs, num_days, num_shifts, seed=seed
+                        ))
+                    print(f"Benchmarking {instance_name}...")
+                    record = {"instance": instance_name, "seed": seed}
+                    record.update(run_benchmark_case(
+                        instance_url, solver_param_dict, sparse=args.sparse_model,
+                        max_consecutive_encoding=args.max_consecutive_encoding
+                    ))
+                    print(f" - {record['status']} objective={record.get('objective')} "
+                          f"build={record['model_build_time']:.2f}s "
+                          f"first feasible={record['first_feasible_time']:.2f}s "
+                          f"solve={record['solve_time']:.2f}s")
+                    record_arr.append(record)
+
+    report_name = f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    report_url = os.path.join(args.output_dir, f"{report_name}.json")
+    with open(report_url, "w") as f:
+        json.dump({
+            "environment": get_environment_info(),
+            "solver_parameters": solver_param_dict,
+            "sparse_model": args.sparse_model,
+            "max_consecutive_encoding": args.max_consecutive_encoding,
+            "results": record_arr,
+        }, f, indent=4)
+    pd.DataFrame(record_arr).to_csv(os.path.join(args.output_dir, f"{report_name}.csv"), index=False)
+    print("Benchmark report saved to {}".format(report_url))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="synthetic instance benchmark flags")
+    parser.add_argument(
+        "--output_dir", type=str, default="../benchmarks/",
+        help="directory of the generated instances and the benchmark reports"
+    )
+    parser.add_argument(
+        "--num_staffs", type=int, nargs="+", default=[10, 20, 40],
+        help="staff counts of the instances"
+    )
+    parser.add_argument(
+        "--num_days", type=int, nargs="+", default=[28, 91, 182],
+        help="horizon lengths (days) of the instances"
+    )
+    parser.add_argument(
+        "--num_shifts", type=int, nargs="+", default=[2, 3],
+        help="shifts per day of the instances"
+    )
+    parser.add_argument(
+        "--seeds", type=int, nargs="+", default=[0],
+        help="random seeds of the instances"
+    )
+    parser.add_argument(
+        "--max_solve_time", type=int, help="max time in seconds to solve each instance",
+        default=10
+    )
+    parser.add_argument(
+        "--sparse_model", action="store_true",
+        help="do not create variables for non-existing or unavailable shifts"
+    )
+    parser.add_argument(
+        "--max_consecutive_encoding", type=str, default="window",
+        choices=["window", "prefix", "automaton"],
+        help="encoding of the max consecutive days constraint"
+    )
+    get_solver_args(parser)
+
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,7 @@
+python run_benchmark.py \
+    --output_dir "../../benchmarks" \
+    --num_staffs 10 20 40 \
+    --num_days 28 91 182 \
+    --num_shifts 2 3 \
+    --seeds 0 1 \
+    --max_solve_time 10
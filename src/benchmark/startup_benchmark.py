@@ -0,0 +1,75 @@
+import argparse, os, sys, time, json, subprocess
+from datetime import datetime
+import numpy as np
+import pandas as pd
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from benchmark.run_benchmark import get_environment_info
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# (name, python args) of the timed commands, run from the src directory
+STARTUP_COMMANDS = [
+    ("python", ["-c", "pass"]),
+    ("import numpy", ["-c", "import numpy"]),
+    ("import pandas", ["-c", "import pandas"]),
+    ("import cp_model", ["-c", "from ortools.sat.python import cp_model"]),
+    ("cli.py --help", ["cli.py", "--help"]),
+    ("cli.py matrix --help", ["cli.py", "matrix", "--help"]),
+    ("cli.py solve --help", ["cli.py", "solve", "--help"]),
+    ("main.py --help", ["main.py", "--help"]),
+]
+
+
+def time_command(python_args: list, num_repeats: int) -> np.ndarray:
+    """
+    Return the wall times in seconds of num_repeats fresh interpreter runs
+    of the python args.
+    """
+    time_arr = []
+    for _ in range(num_repeats):
+        start_time = time.perf_counter()
+        subprocess.run(
+            [sys.executable] + python_args, cwd=SRC_DIR, check=True,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        time_arr.append(time.perf_counter() - start_time)
+    return np.array(time_arr)
+
+
+def main(args):
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
+    record_arr = []
+    for name, python_args in STARTUP_COMMANDS:
+        time_arr = time_command(python_args, args.num_repeats)
+        record = {
+            "command": name, "min_time": time_arr.min(),
+            "median_time": float(np.median(time_arr)), "max_time": time_arr.max(),
+        }
+        print(f" - {name}: median={record['median_time']:.3f}s min={record['min_time']:.3f}s")
+        record_arr.append(record)
+
+    report_name = f"startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    report_url = os.path.join(args.output_dir, f"{report_name}.json")
+    with open(report_url, "w") as f:
+        json.dump({
+            "environment": get_environment_info(),
+            "num_repeats": args.num_repeats,
+            "results": record_arr,
+        }, f, indent=4)
+    pd.DataFrame(record_arr).to_csv(os.path.join(args.output_dir, f"{report_name}.csv"), index=False)
+    print("Startup benchmark report saved to {}".format(report_url))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="startup time benchmark flags")
+    parser.add_argument(
+        "--output_dir", type=str, default="../benchmarks/",
+        help="directory of the benchmark reports"
+    )
+    parser.add_argument(
+        "--num_repeats", type=int, default=5,
+        help="number of fresh interpreter runs of every command"
+    )
+
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,123 @@
+import os
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.utils import get_date_arr, Calendar
+
+# survey answer distribution: can't (-2), rather not (-1), no preference (0),
+# OK (1) and want (2)
+PREF_VALUES = [-2, -1, 0, 1, 2]
+PREF_PROBS = [0.1, 0.1, 0.35, 0.3, 0.15]
+MAX_CONSECUTIVE_VALUES = [2, 3, 4, 5, 7]
+MAX_CONSECUTIVE_PROBS = [0.15, 0.35, 0.25, 0.15, 0.1]
+SHIFT_NAMES = ["Primary", "Secondary", "Daytime"]
+
+
+def generate_instance(num_staffs: int, num_days: int, num_shifts: int, seed: int=0,
+                      start_date: str="01/02/22", date_format: str="%m/%d/%y",
+                      weekday_num_shifts: int=None, weekend_num_shifts: int=None,
+                      unavailable_day_rate: float=0.03,
+                      unavailable_weekday_rate: float=0.1) -> dict:
+    """
+    Generate a seeded synthetic scheduling instance.
+
+    Like the survey, every staff answers one preference per day of week for
+    weekdays and one per weekend day, shared by all shifts of the day. Every
+    staff is also unavailable (-3) for some shifts of some days of week and
+    for all shifts of random dates. Non-existing shifts are -2. Weekends
+    (Saturday & Sunday) have weekend_num_shifts (default num_shifts) shifts
+    and weekdays have weekday_num_shifts (default num_shifts - 1) shifts.
+    """
+    rng = np.random.default_rng(seed)
+    if weekday_num_shifts is None:
+        weekday_num_shifts = max(num_shifts - 1, 1)
+    if weekend_num_shifts is None:
+        weekend_num_shifts = num_shifts
+    end_date = datetime.strptime(start_date, date_format) + timedelta(days=num_days - 1)
+    date_list = get_date_arr(start_date, end_date.strftime(date_format), date_format)
+    calendar = Calendar(date_list, date_format)
+    shift_list = SHIFT_NAMES[:num_shifts] + \
+        [f"Shift {s + 1}" for s in range(len(SHIFT_NAMES), num_shifts)]
+    staff_list = [f"Staff {p + 1}" for p in range(num_staffs)]
+
+    # shift matrix
+    num_shifts_arr = np.where(calendar.weekend_mask, weekend_num_shifts, weekday_num_shifts)
+    shift_mat = (np.arange(num_shifts)[None, :] < num_shifts_arr[:, None]).astype(int)
+    shift_mat_df = pd.DataFrame({"date": date_list})
+    for s, shift in enumerate(shift_list):
+        shift_mat_df[shift] = shift_mat[:, s]
+
+    # preferences
+    day_of_week_pref_mat = rng.choice(PREF_VALUES, size=(num_staffs, 7), p=PREF_PROBS)
+    day_pref_mat = day_of_week_pref_mat[:, calendar.weekday_arr]
+    weekend_pref_mat = rng.choice(PREF_VALUES, size=(num_staffs, num_days), p=PREF_PROBS)
+    day_pref_mat = np.where(calendar.weekend_mask[None, :], weekend_pref_mat, day_pref_mat)
+    pref_tensor = np.repeat(day_pref_mat[:, :, None], num_shifts, axis=2).astype(np.int8)
+
+    # unavailability
+    unavailable_weekday_mat = rng.random((num_staffs, 7, num_shifts)) < unavailable_weekday_rate
+    unavailable_mask = unavailable_weekday_mat[:, calendar.weekday_arr]
+    unavailable_mask |= (rng.random((num_staffs, num_days)) < unavailable_day_rate)[:, :, None]
+    pref_tensor[unavailable_mask] = -3
+    pref_tensor[:, ~shift_mat.astype(bool)] = -2
+
+    max_consecutive_arr = rng.choice(
+        MAX_CONSECUTIVE_VALUES, size=num_staffs, p=MAX_CONSECUTIVE_PROBS
+    )
+    return {
+        "shift_mat_df": shift_mat_df,
+        "staff_list": staff_list,
+        "shift_list": shift_list,
+        "date_list": date_list,
+        "date_format": date_format,
+        "pref_tensor": pref_tensor,
+        "unavailable_mask": unavailable_mask & shift_mat.astype(bool)[None],
+        "max_consecutive_dict": {
+            staff: int(max_consecutive_arr[p]) for p, staff in enumerate(staff_list)
+        },
+    }
+
+
+def save_instance(instance_url: str, instance: dict) -> None:
+    """
+    Save a synthetic instance to a .npz file.
+    """
+    with open(instance_url, "wb") as f:
+        np.savez(
+            f, shift_mat=instance["shift_mat_df"][instance["shift_list"]].to_numpy(),
+            staff_list=np.array(instance["staff_list"]),
+            shift_list=np.array(instance["shift_list"]),
+            date_list=np.array(instance["date_list"]),
+            date_format=np.array(instance["date_format"]),
+            pref_tensor=instance["pref_tensor"],
+            unavailable_mask=instance["unavailable_mask"],
+            max_consecutive_arr=np.array([
+                instance["max_consecutive_dict"][staff] for staff in instance["staff_list"]
+            ]),
+        )
+
+
+def load_instance(instance_url: str) -> dict:
+    """
+    Load a synthetic instance saved by save_instance.
+    """
+    with np.load(instance_url) as data:
+        staff_list = data["staff_list"].tolist()
+        shift_list = data["shift_list"].tolist()
+        date_list = data["date_list"].tolist()
+        shift_mat_df = pd.DataFrame({"date": date_list})
+        for s, shift in enumerate(shift_list):
+            shift_mat_df[shift] = data["shift_mat"][:, s]
+        return {
+            "shift_mat_df": shift_mat_df,
+            "staff_list": staff_list,
+            "shift_list": shift_list,
+            "date_list": date_list,
+            "date_format": str(data["date_format"]),
+            "pref_tensor": data["pref_tensor"],
+            "unavailable_mask": data["unavailable_mask"],
+            "max_consecutive_dict": {
+                staff: int(max_cons) for staff, max_cons in zip(staff_list, data["max_consecutive_arr"])
+            },
+        }
@@ -0,0 +1,150 @@
+import argparse, os, sys
+from datetime import datetime
+from args import get_main_args, get_shift_req_args, get_solver_args
+
+# pandas, numpy and ortools are imported inside the commands that use them,
+# so --help and the light commands start without loading them
+
+
+def run_matrix(args) -> int:
+    from data_process.schedule_matrix import get_schedule_matrix
+    get_schedule_matrix(args)
+    return 0
+
+
+def run_solve(args) -> int:
+    from main import main
+    result_dict = main(args)
+    return 0 if result_dict["status"] in ["OPTIMAL", "FEASIBLE"] else 1
+
+
+def get_solution_outputter(args):
+    """
+    Return the schedule outputter of the saved --solution on the parsed
+    inputs (from the input cache if unchanged) of the run.
+    """
+    from main import load_inputs
+    from profiler import StageProfiler
+    from data_process.utils import Calendar
+    from data_process.result_writer import load_solution_matrix
+    from data_process.schedule_outputters import SCHEDULE_OUTPUTTER_DICT
+    assert args.outputter in SCHEDULE_OUTPUTTER_DICT, \
+        f"Invalid outputter: {args.outputter} (supported: {list(SCHEDULE_OUTPUTTER_DICT)})"
+    solution_url = os.path.join(args.data_dir, args.data_name, "solutions", args.solution)
+    assert os.path.isfile(solution_url), f"Solution file: {solution_url} not found"
+
+    input_dict = load_inputs(args, StageProfiler(enabled=False))
+    staff_list, shift_list = input_dict["staff_list"], input_dict["shift_list"]
+    calendar = Calendar(
+        input_dict["date_list"], date_format=args.date_format, holidays=args.special_weekends
+    )
+    return SCHEDULE_OUTPUTTER_DICT[args.outputter](
+        solver=None, shift_vars=None, date_list=input_dict["date_list"],
+        staff_list=staff_list, shift_list=shift_list, date_format=args.date_format,
+        pref_tensor=input_dict["pref_tensor"], calendar=calendar,
+        solution_mat=load_solution_matrix(solution_url, staff_list, shift_list, calendar),
+        max_consecutive_dict={
+            staff: int(input_dict["max_consecutive_arr"][p]) for p, staff in enumerate(staff_list)
+        },
+        shift_mat=input_dict["shift_mat"], unavailable_mask=input_dict["unavailable_mask"]
+    )
+
+
+def run_verify(args) -> int:
+    schedule_outputter = get_solution_outputter(args)
+    is_valid = schedule_outputter.verify_schedule()
+    print(f"{args.solution} is {'valid' if is_valid else 'invalid'}")
+    return 0 if is_valid else 1
+
+
+def run_stats(args) -> int:
+    schedule_outputter = get_solution_outputter(args)
+    stats_df = schedule_outputter.get_schedule_stats(verbose=args.verbose)
+    print(stats_df)
+    return 0
+
+
+def run_export(args) -> int:
+    from data_process.result_writer import ResultWriter, check_output_formats
+    check_output_formats(args.output_formats)
+    schedule_outputter = get_solution_outputter(args)
+    stats_df = schedule_outputter.get_schedule_stats(verbose=False)
+    solution_mat = schedule_outputter.get_schedule_matrix()
+    metadata = {
+        "data_name": args.data_name,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "source": args.solution,
+        "num_staffs": solution_mat.shape[0], "num_days": solution_mat.shape[1],
+        "num_shifts": solution_mat.shape[2],
+        "want_count": int(stats_df["want_count"].sum()),
+        "cant_count": int(stats_df["cant_count"].sum()),
+    }
+    file_name = args.export_file_name
+    if file_name is None:
+        file_name = os.path.splitext(args.solution)[0]
+    result_writer = ResultWriter(
+        os.path.join(args.data_dir, args.data_name, "solutions"),
+        file_name=file_name, formats=args.output_formats
+    )
+    for result_url in result_writer.write(
+        schedule_outputter.get_schedule_df(), stats_df, solution_mat, metadata
+    ):
+        print("Results saved to {}".format(result_url))
+    return 0
+
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="schedule finder commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    matrix_parser = subparsers.add_parser(
+        "matrix", help="generate data_dir/data_name/schedule_matrix.xlsx"
+    )
+    matrix_parser.add_argument(
+        "--data_dir", type=str, default="../data/", help="data directory"
+    )
+    matrix_parser.add_argument(
+        "--data_name", type=str, required=True,
+        help="name of the data to generate shift matrix for",
+    )
+    matrix_parser.add_argument(
+        "--date_format", type=str, help="format string for start/end date",
+        default="%m/%d/%y"
+    )
+    get_shift_req_args(matrix_parser)
+    matrix_parser.set_defaults(run=run_matrix)
+
+    solve_parser = subparsers.add_parser("solve", help="find a schedule, same flags as main.py")
+    get_main_args(solve_parser)
+    get_shift_req_args(solve_parser)
+    get_solver_args(solve_parser)
+    solve_parser.set_defaults(run=run_solve)
+
+    for command, run, help_str in [
+        ("verify", run_verify, "verify a saved solution against the inputs"),
+        ("stats", run_stats, "print the per staff stats of a saved solution"),
+        ("export", run_export, "write a saved solution to other --output_formats"),
+    ]:
+        command_parser = subparsers.add_parser(command, help=help_str)
+        get_main_args(command_parser)
+        get_shift_req_args(command_parser)
+        command_parser.add_argument(
+            "--solution", type=str, required=True,
+            help="saved solution (.npy, .xlsx or .csv) in data_dir/data_name/solutions"
+        )
+        if command == "stats":
+            command_parser.add_argument(
+                "--verbose", action="store_true", help="print the stats of every staff"
+            )
+        if command == "export":
+            command_parser.add_argument(
+                "--export_file_name", type=str, default=None,
+                help="file name of the exported results, default: the solution file name"
+            )
+        command_parser.set_defaults(run=run)
+    return parser
+
+
+if __name__ == "__main__":
+    args = get_parser().parse_args()
+    sys.exit(args.run(args))
@@ -43,6 +43,15 @@ class PreferenceInputterInterface(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError
 
+    def get_all_pref_tensor(self) -> np.ndarray:
+        """
+        Return the preference tensor (staff x day x shift) of all staffs,
+        ordered as get_staff_names().
+        """
+        return np.stack([
+            self.get_staff_pref_matrix(staff) for staff in self.get_staff_names()
+        ])
+
     @abc.abstractmethod
     def get_staff_max_consecutive_shifts(self, staff: str) -> int:
         """
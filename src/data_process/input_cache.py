@@ -0,0 +1,108 @@
+import os, json, shutil, hashlib
+import numpy as np
+
+# bump when the parsed input layout changes to invalidate old entries
+CACHE_VERSION = 2
+CACHE_ARRAY_KEYS = ["shift_mat", "pref_tensor", "max_consecutive_arr", "unavailable_mask"]
+CACHE_LIST_KEYS = ["date_list", "shift_list", "staff_list"]
+
+
+def get_file_hash(file_url: str) -> str:
+    """
+    Return the sha256 hex digest of the content of a file, "missing" if
+    the file does not exist.
+    """
+    if not os.path.isfile(file_url):
+        return "missing"
+    sha = hashlib.sha256()
+    with open(file_url, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class InputCache():
+    """
+    Cache of parsed inputs keyed on the content hash of the raw input files
+    and the args they are parsed with, so changing any of them misses the
+    cache. Each entry is a directory of .npy arrays (memory-mappable) and a
+    meta.json of the date, shift and staff lists. Entries are evicted least
+    recently used first once the cache is larger than max_size_mb.
+    """
+    def __init__(self, cache_dir: str, max_size_mb: float=512) -> None:
+        self.cache_dir = cache_dir
+        self.max_size_mb = max_size_mb
+
+    def get_key(self, file_url_list: list, arg_dict: dict) -> str:
+        """
+        Return the cache key of the raw input files and the parsing args.
+        """
+        sha = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+        for file_url in file_url_list:
+            sha.update(get_file_hash(file_url).encode())
+        sha.update(json.dumps(arg_dict, sort_keys=True, default=str).encode())
+        return sha.hexdigest()[:32]
+
+    def load(self, key: str, mmap_mode: str=None) -> dict:
+        """
+        Return the cached inputs of the key, None on a cache miss.
+        """
+        entry_dir = os.path.join(self.cache_dir, key)
+        meta_url = os.path.join(entry_dir, "meta.json")
+        if not os.path.isfile(meta_url):
+            return None
+        with open(meta_url) as f:
+            input_dict = json.load(f)
+        for array_key in CACHE_ARRAY_KEYS:
+            input_dict[array_key] = np.load(
+                os.path.join(entry_dir, f"{array_key}.npy"), mmap_mode=mmap_mode
+            )
+        # mark as recently used
+        os.utime(entry_dir)
+        return input_dict
+
+    def save(self, key: str, input_dict: dict) -> None:
+        """
+        Save the inputs under the key and evict old entries. The entry is
+        written to a temporary directory and renamed, so readers never see
+        a partial entry.
+        """
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        entry_dir = os.path.join(self.cache_dir, key)
+        tmp_dir = f"{entry_dir}.tmp{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for array_key in CACHE_ARRAY_KEYS:
+            np.save(os.path.join(tmp_dir, f"{array_key}.npy"), np.asarray(input_dict[array_key]))
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({list_key: list(input_dict[list_key]) for list_key in CACHE_LIST_KEYS}, f)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        try:
+            os.replace(tmp_dir, entry_dir)
+        except OSError:
+            # another process saved the same entry first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache fits in
+        max_size_mb.
+        """
+        entry_arr = []
+        for key in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, key)
+            if not os.path.isdir(entry_dir) or ".tmp" in key:
+                continue
+            size = sum(
+                os.path.getsize(os.path.join(entry_dir, file_name))
+                for file_name in os.listdir(entry_dir)
+            )
+            entry_arr.append((os.path.getmtime(entry_dir), size, entry_dir))
+        total_size = sum(size for _, size, _ in entry_arr)
+        for _, size, entry_dir in sorted(entry_arr):
+            if total_size <= self.max_size_mb * 1024 ** 2:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
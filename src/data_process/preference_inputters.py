@@ -1,100 +1,166 @@
-import json
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from .data_interfaces import PreferenceInputterInterface
-from .utils import is_saturday, is_sunday, keep_trail_parentheses_num, \
-    keep_trail_bracket_str, contain_same_day, is_weekend, \
-    validate_datestr, is_saturday_sunday, is_friday, get_day_of_week_str
+from .utils import keep_trail_parentheses_num, load_unavailable_mask, Calendar
+from .table_readers import read_table, read_table_columns
 
 
 class ElmBasePreferenceInputter(PreferenceInputterInterface):
     def __init__(
             self, file_path: str, shift_mat_df: pd.DataFrame,
             holidays: list, date_format: str = "%m/%d/%y", 
-            staff_unavailable_json: str = None
+            staff_unavailable_json: str = None, calendar: Calendar = None
         ):
             self.file_path = file_path
-            self.staff_pref_df = pd.read_excel(self.file_path)
             self.shift_mat_df = shift_mat_df
             self.date_list = shift_mat_df['date'].tolist()
             self.holidays = holidays
             self.shifts_names = shift_mat_df.columns.tolist()
             self.shifts_names.remove('date')
             self.date_format = date_format
-            self.dat_of_week = [
-                "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"
+            if calendar is None:
+                calendar = Calendar(self.date_list, self.date_format, holidays=self.holidays)
+            self.calendar = calendar
+            self.meta_columns = [
+                "Timestamp", "Name", "Maximum acceptable number of back-to-back on-call ",
+                "Additional comments"
             ]
-            
-            staff_unavailable_dict = json.load(open(staff_unavailable_json))
-            # unavailable days varification
-            for staff in staff_unavailable_dict.keys():
-                assert staff in self.get_staff_names(), \
-                    "Staff unavailable dict keys are not in the staff list"
-                for key in staff_unavailable_dict[staff]:
-                        is_day_of_week =  key in self.dat_of_week
-                        is_date = validate_datestr(key, self.date_format)
-                        assert is_day_of_week or is_date, \
-                            f"{staff}'s unavailable dict keys ({key}) is" \
-                            f"not valid date string or valid day of week"
-                        if staff_unavailable_dict[staff][key] == "ALL":
-                            staff_unavailable_dict[staff][key] = self.shifts_names
-                        assert isinstance(staff_unavailable_dict[staff][key], list), \
-                            f"{staff}'s unavailable dict values ({staff_unavailable_dict[staff][key]}) " \
-                            f"isn't a list"
-            self.staff_unavailable_dict = staff_unavailable_dict
-                        
+
+            # (date x shift) -> raw data table column index lookup table,
+            # resolved from the header and then remapped to the loaded columns
+            self.raw_columns = read_table_columns(self.file_path)
+            self.shift_mat = self.shift_mat_df[self.shifts_names].to_numpy().astype(bool)
+            self.shift_mat.setflags(write=False)
+            self.column_idx_mat = self.get_column_idx_mat()
+            if len(self.unused_columns) > 0:
+                print(f"Unused columns in {self.file_path}: {self.unused_columns}")
+            # only load the name, back-to-back and used preference columns
+            missing_columns = [
+                column for column in self.get_used_meta_columns() if column not in self.raw_columns
+            ]
+            assert len(missing_columns) == 0, \
+                f"Columns not found in {self.file_path}: {missing_columns}"
+            used_column_idx = set(self.column_idx_mat[self.shift_mat].tolist())
+            used_column_idx.update(
+                self.raw_columns.index(column) for column in self.get_used_meta_columns()
+            )
+            loaded_column_idx = sorted(used_column_idx)
+            self.staff_pref_df = read_table(
+                self.file_path, columns=[self.raw_columns[k] for k in loaded_column_idx]
+            )
+            column_idx_map = np.full(len(self.raw_columns), -1)
+            column_idx_map[loaded_column_idx] = np.arange(len(loaded_column_idx))
+            self.column_idx_mat = np.where(
+                self.column_idx_mat > -1, column_idx_map[self.column_idx_mat], -1
+            )
+            self.column_idx_mat.setflags(write=False)
+
+            # (staff x day x shift) unavailable shifts, validated and compiled once
+            self.unavailable_mask = load_unavailable_mask(
+                staff_unavailable_json, self.get_staff_names(), self.shifts_names, self.calendar
+            )
+            self.unavailable_mask.setflags(write=False)
+
 
     def get_staff_names(self) -> list:
         return self.staff_pref_df["Name"].tolist()
 
+    def get_unavailable_mask(self) -> np.ndarray:
+        """
+        Return the read-only (staff x day x shift) unavailable shift mask,
+        ordered as get_staff_names().
+        """
+        return self.unavailable_mask
+
     def get_holiday_column_name(self, curr_date: datetime) -> str:
         """
         Get the column name of the holiday shift
         """
         raise NotImplementedError("Holiday column name is not implemented")
 
+    def get_used_meta_columns(self) -> list:
+        """
+        Return the non-preference columns read from the raw data table.
+        """
+        return ["Name", "Maximum acceptable number of back-to-back on-call "]
+
+    def get_column_idx_mat(self) -> np.ndarray:
+        """
+        Resolve every existing (date, shift) to its column index in the raw
+        data table header (-1 for non-existing shifts) and return the
+        (date x shift) table. Raise if any resolved column is missing from
+        the raw data table, and keep the never used columns in unused_columns.
+        """
+        raw_column_idx_dict = {column: k for k, column in enumerate(self.raw_columns)}
+        column_idx_mat = np.full(self.shift_mat.shape, -1)
+        missing_columns = []
+        for i, date in enumerate(self.date_list):
+            for j, shift in enumerate(self.shifts_names):
+                if self.shift_mat[i, j]:
+                    column_name = self.build_column_name(date, shift)
+                    if column_name in raw_column_idx_dict:
+                        column_idx_mat[i, j] = raw_column_idx_dict[column_name]
+                    elif column_name not in missing_columns:
+                        missing_columns.append(column_name)
+        assert len(missing_columns) == 0, \
+            f"Columns not found in {self.file_path}: {missing_columns}"
+
+        used_column_idx = set(column_idx_mat[self.shift_mat].tolist())
+        self.unused_columns = [
+            column for k, column in enumerate(self.raw_columns)
+            if k not in used_column_idx and column not in self.meta_columns
+        ]
+        return column_idx_mat
+
     def shift_to_column_name(self, date_str: str, shift_name) -> str:
+        assert shift_name in self.shifts_names, "Invalid shift name"
+        date_idx = self.calendar.get_date_idx(date_str)
+        assert date_idx > -1, "Date string does not in the date list provided"
+        column_idx = self.column_idx_mat[date_idx, self.shifts_names.index(shift_name)]
+        assert column_idx > -1, f"No {shift_name} shift on {date_str}"
+        return self.staff_pref_df.columns[column_idx]
+
+    def build_column_name(self, date_str: str, shift_name) -> str:
+        """
+        Build the raw data table column name of a given shift
+        """
         # data verification
-        assert validate_datestr(date_str), "Invalid date string"
-        assert contain_same_day(date_str, self.date_list, self.date_format), \
-            "Date string does not in the date list provided"
+        date_idx = self.calendar.get_date_idx(date_str)
+        assert date_idx > -1, "Date string does not in the date list provided"
         assert shift_name in self.shifts_names, "Invalid shift name"
         assert shift_name in ["Primary", "Secondary"], "Invalid shift name"
 
         # Get appropriatea column name
-        curr_date = datetime.strptime(date_str, self.date_format)
-        if contain_same_day(date_str, self.holidays, self.date_format):
-            column_name = self.get_holiday_column_name(curr_date)
-        elif is_friday(date_str):
-            curr_date_str = datetime.strftime(curr_date, "%-m/%-d")
-            next_date = curr_date + timedelta(days=1)
-            next_date_str = datetime.strftime(next_date, "%-m/%-d")
+        curr_date = self.calendar.get_date(date_idx)
+        weekday = self.calendar.weekday_arr[date_idx]
+        curr_date_str = f"{curr_date.month}/{curr_date.day}"
+        next_date = curr_date + timedelta(days=1)
+        next_date_str = f"{next_date.month}/{next_date.day}"
+        prev_date = curr_date - timedelta(days=1)
+        prev_date_str = f"{prev_date.month}/{prev_date.day}"
+        if self.calendar.holiday_mask[date_idx]:
+            column_name = self.get_holiday_column_name(
+                datetime.combine(curr_date, datetime.min.time())
+            )
+        elif weekday == 4:
             column_name = f"Weekend night-time on-call preferences (Friday & Saturday) " \
                            f"[{curr_date_str} - {next_date_str}]"
-        elif is_saturday(date_str):
-            curr_date_str = datetime.strftime(curr_date, "%-m/%-d")
-            next_date = curr_date + timedelta(days=1)
-            next_date_str = datetime.strftime(next_date, "%-m/%-d")
-            prev_date = curr_date - timedelta(days=1)
-            prev_date_str = datetime.strftime(prev_date, "%-m/%-d")
+        elif weekday == 5:
             if shift_name == "Daytime":
                 column_name = f"Weekend day-time on-call preferences (Saturday & Sunday) " \
                               f"[{curr_date_str} - {next_date_str}]"
             else:
                 column_name = f"Weekend night-time on-call preferences (Friday & Saturday) " \
                               f"[{prev_date_str} - {curr_date_str}]"
-        elif is_sunday(date_str):
-            curr_date_str = datetime.strftime(curr_date, "%-m/%-d")
-            prev_date = curr_date - timedelta(days=1)
-            prev_date_str = datetime.strftime(prev_date, "%-m/%-d")
+        elif weekday == 6:
             if shift_name == "Daytime":
                 column_name = f"Weekend day-time on-call preferences (Saturday & Sunday) " \
                               f"[{prev_date_str} - {curr_date_str}]"
             else:
                 column_name = f"Weekday on-call preferences [Sunday]"
         else:
-            day_of_week = get_day_of_week_str(date_str, self.date_format)
+            day_of_week = self.calendar.get_day_of_week_str(date_idx)
             column_name = f"Weekday on-call preferences [{day_of_week}]"
 
         return column_name
@@ -106,36 +172,41 @@ class ElmBasePreferenceInputter(PreferenceInputterInterface):
         return keep_trail_parentheses_num(pref_str)
 
     def get_staff_pref_matrix(self, staff: str) -> np.ndarray:
-        pref_mat = np.zeros((self.shift_mat_df.shape[0], self.shift_mat_df.shape[1]-1))
-        assert pref_mat.shape == (len(self.date_list), len(self.shifts_names)), \
-            "Preference matrix shape does not match"
-        unavailable_dict = self.staff_unavailable_dict.get(staff, {})
-        for i, date in enumerate(self.date_list):
-            day_of_week = get_day_of_week_str(date, self.date_format)
-            is_unavailble_day = day_of_week in unavailable_dict.keys() or \
-                                date in unavailable_dict.keys()
-            for j, shift in enumerate(self.shifts_names):
-                has_shift = self.shift_mat_df.loc[self.shift_mat_df["date"]==date, shift].values[0]
-                if has_shift:
-                    pref_value = None
-                    if is_unavailble_day:
-                        try:
-                            unavailable_shift = unavailable_dict[day_of_week]
-                        except KeyError:
-                            unavailable_shift = unavailable_dict[date]
-                        if shift in unavailable_shift:
-                            pref_value = -3
-                    if pref_value is None:
-                        shift_col_name = self.shift_to_column_name(date, shift)
-                        pref_str = self.staff_pref_df.loc[self.staff_pref_df["Name"]==staff, shift_col_name].values[0]
-                        try:
-                            pref_value = self.parse_preference_string(pref_str)
-                        except:
-                            pref_value = 0
-                    pref_mat[i, j] = pref_value
-                else:
-                    pref_mat[i, j] = -2
-        return pref_mat
+        staff_idx = self.get_staff_names().index(staff)
+        return self.get_pref_tensor([staff_idx])[0]
+
+    def get_all_pref_tensor(self) -> np.ndarray:
+        """
+        Return the preference tensor (staff x day x shift) of all staffs,
+        ordered as get_staff_names().
+        """
+        return self.get_pref_tensor(range(len(self.staff_pref_df)))
+
+    def get_pref_tensor(self, staff_idx_arr) -> np.ndarray:
+        """
+        Return the int8 preference tensor (staff x day x shift) of the staffs
+        in the given rows of the raw data table. Each used column is parsed
+        once and the tensor is filled by array indexing.
+        """
+        staff_idx_arr = list(staff_idx_arr)
+        raw_pref_arr = self.staff_pref_df.to_numpy()[staff_idx_arr]
+
+        # parse every staff response of the used columns
+        pref_arr = np.zeros(raw_pref_arr.shape, dtype=np.int8)
+        for k in np.unique(self.column_idx_mat[self.shift_mat]):
+            for p, pref_str in enumerate(raw_pref_arr[:, k]):
+                # empty (NaN) or unparsable responses are neutral
+                try:
+                    pref_arr[p, k] = self.parse_preference_string(pref_str)
+                except (ValueError, TypeError, AttributeError, AssertionError):
+                    pref_arr[p, k] = 0
+
+        pref_tensor = np.full((len(staff_idx_arr),) + self.shift_mat.shape, -2, dtype=np.int8)
+        pref_tensor[:, self.shift_mat] = \
+            pref_arr[:, self.column_idx_mat[self.shift_mat]]
+
+        pref_tensor[self.unavailable_mask[staff_idx_arr] & self.shift_mat] = -3
+        return pref_tensor
 
     def get_staff_max_consecutive_shifts(self, staff: str) -> int:
         return self.staff_pref_df.loc[
@@ -160,4 +231,11 @@ class ElmSpring2022PreferenceInputer(ElmBasePreferenceInputter):
             column_name = "Holiday on-call preferences [5/30/2022 Memorial Day]"
         else:
             raise ValueError("Invalid holiday date")
-        return column_name
\ No newline at end of file
+        return column_name
+
+
+# inputters selectable by name, e.g. with the --inputter flag
+PREFERENCE_INPUTTER_DICT = {
+    "ElmWinter2022PreferenceInputer": ElmWinter2022PreferenceInputer,
+    "ElmSpring2022PreferenceInputer": ElmSpring2022PreferenceInputer,
+}
@@ -0,0 +1,131 @@
+import os, json, importlib.util
+import numpy as np
+import pandas as pd
+
+RESULT_FORMATS = ["xlsx", "csv", "parquet", "json", "npy"]
+
+
+def check_output_formats(formats: list) -> None:
+    """
+    Assert that every output format is supported and its writer is installed.
+    """
+    for output_format in formats:
+        assert output_format in RESULT_FORMATS, \
+            f"Invalid output format: {output_format} (supported: {RESULT_FORMATS})"
+    if "parquet" in formats:
+        assert importlib.util.find_spec("pyarrow") is not None, \
+            "The parquet output format needs pyarrow (pip install pyarrow)"
+
+
+class ResultWriter():
+    """
+    Write the schedule, the per staff stats and the run metadata of a
+    solution to every selected format in one pass:
+        - xlsx: one workbook with "Schedule", "Stats" and "Metadata" sheets,
+          streamed row by row by a write-only workbook
+        - csv / parquet: <file_name>.<ext> schedule and <file_name>_stats.<ext>
+        - json: <file_name>.json with "metadata", "schedule" and "stats" keys
+        - npy: <file_name>.npy (staff x day x shift) solution tensor
+    """
+    def __init__(self, output_dir: str, file_name: str="solution",
+                 formats: list=["xlsx"]) -> None:
+        check_output_formats(formats)
+        self.output_dir = output_dir
+        self.file_name = file_name
+        self.formats = formats
+
+    def get_url(self, output_format: str, suffix: str="") -> str:
+        return os.path.join(self.output_dir, f"{self.file_name}{suffix}.{output_format}")
+
+    def write(self, schedule_df: pd.DataFrame, stats_df: pd.DataFrame,
+              solution_mat: np.ndarray, metadata: dict) -> list:
+        """
+        Write the results to every selected format and return the written
+        file paths.
+        """
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+        url_arr = []
+        for output_format in self.formats:
+            if output_format == "xlsx":
+                url_arr += self.write_xlsx(schedule_df, stats_df, metadata)
+            elif output_format == "csv":
+                schedule_df.to_csv(self.get_url("csv"), index=False)
+                stats_df.to_csv(self.get_url("csv", "_stats"), index=False)
+                url_arr += [self.get_url("csv"), self.get_url("csv", "_stats")]
+            elif output_format == "parquet":
+                schedule_df.to_parquet(self.get_url("parquet"), index=False)
+                stats_df.to_parquet(self.get_url("parquet", "_stats"), index=False)
+                url_arr += [self.get_url("parquet"), self.get_url("parquet", "_stats")]
+            elif output_format == "json":
+                with open(self.get_url("json"), "w") as f:
+                    json.dump({
+                        "metadata": metadata,
+                        "schedule": schedule_df.to_dict(orient="records"),
+                        "stats": stats_df.to_dict(orient="records"),
+                    }, f, indent=4, default=str)
+                url_arr.append(self.get_url("json"))
+            elif output_format == "npy":
+                np.save(self.get_url("npy"), np.asarray(solution_mat, dtype=np.int8))
+                url_arr.append(self.get_url("npy"))
+        return url_arr
+
+    def write_xlsx(self, schedule_df, stats_df, metadata) -> list:
+        import openpyxl
+        workbook = openpyxl.Workbook(write_only=True)
+        metadata_df = pd.DataFrame({
+            "key": list(metadata.keys()),
+            "value": [
+                value if isinstance(value, (int, float, str)) else json.dumps(value, default=str)
+                for value in metadata.values()
+            ]
+        })
+        for sheet_name, df in [("Schedule", schedule_df), ("Stats", stats_df),
+                               ("Metadata", metadata_df)]:
+            worksheet = workbook.create_sheet(sheet_name)
+            worksheet.append(df.columns.tolist())
+            for row in df.itertuples(index=False):
+                worksheet.append([None if pd.isna(value) else value for value in row])
+        workbook.save(self.get_url("xlsx"))
+        return [self.get_url("xlsx")]
+
+
+def load_solution_matrix(solution_url: str, staff_list: list, shift_list: list,
+                         calendar) -> np.ndarray:
+    """
+    Load a previous solution, either a .npy solution matrix or a schedule
+    spreadsheet or csv (e.g. written by ResultWriter), as a (staff x day x
+    shift) solution matrix of the current schedule. Spreadsheet rows are
+    mapped by staff name, date and shift name, and the ones not in the
+    current schedule are dropped.
+    """
+    solution_shape = (len(staff_list), calendar.num_days, len(shift_list))
+    if solution_url.endswith(".npy"):
+        solution_mat = np.load(solution_url)
+        assert solution_mat.shape == solution_shape, \
+            f"Solution matrix shape {solution_mat.shape} does not match " \
+            f"the schedule {solution_shape}"
+        return solution_mat.astype(np.int8)
+
+    if solution_url.endswith(".csv"):
+        schedule_df = pd.read_csv(solution_url)
+    else:
+        schedule_df = pd.read_excel(solution_url)
+    staff_idx_dict = {str(staff).strip(): i for i, staff in enumerate(staff_list)}
+    shift_idx_dict = {shift: i for i, shift in enumerate(shift_list)}
+    solution_mat = np.zeros(solution_shape, dtype=np.int8)
+    num_dropped = 0
+    for staff, date, shift in zip(schedule_df["Full Name"], 
+                                  schedule_df["On-Call Date"], schedule_df["Shift"]):
+        if not isinstance(date, str):
+            date = date.strftime(calendar.date_format)
+        p = staff_idx_dict.get(str(staff).strip(), -1)
+        d = calendar.get_date_idx(date)
+        s = shift_idx_dict.get(shift, -1)
+        if p > -1 and d > -1 and s > -1:
+            solution_mat[p, d, s] = 1
+        else:
+            num_dropped += 1
+    if num_dropped > 0:
+        print(f"{num_dropped} assignments in {solution_url} are not in the current schedule")
+    return solution_mat
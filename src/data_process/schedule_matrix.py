@@ -1,7 +1,8 @@
 import argparse, os
+import numpy as np
 import pandas as pd
-from data_process.utils import get_date_arr, validate_datestr, \
-                               is_weekend, is_same_day, contain_same_day
+from data_process.utils import get_date_arr, validate_datestr, Calendar
+from data_process.table_readers import read_table
 from args import get_shift_req_args
 
 def get_schedule_matrix(args):
@@ -13,8 +14,20 @@ def get_schedule_matrix(args):
     if os.path.exists(data_url) and not args.overwrite:
         print(f"Shift matrix already exists at: {data_url} "
               f"use --overwrite to overwrite")
-        return pd.read_excel(data_url)
+        return read_table(data_url)
 
+    df = build_schedule_matrix(args)
+    with pd.ExcelWriter(data_url, datetime_format="mm/dd/yy") as df_writer:
+        df.to_excel(df_writer, index=False)
+    print(f"Shift requirements saved at {data_url}")
+    return df
+
+
+def build_schedule_matrix(args) -> pd.DataFrame:
+    """
+    Build the schedule matrix of the shift requirement args without
+    reading or writing schedule_matrix.xlsx.
+    """
     # Validating all the date string inputs
     assert validate_datestr(args.start_date, args.date_format), \
         "Invalid start date: {}".format(args.start_date)
@@ -40,29 +53,22 @@ def get_schedule_matrix(args):
         "--weekend_num_shifts must be less than or equal to --max_num_shifts"
     
     # creating date string between start & end dates
-    date_arr = get_date_arr(args.start_date, args.end_date, args.date_format)
-    date_arr = filter(lambda x: not contain_same_day(x, args.excluding_dates), date_arr)
+    calendar = Calendar(
+        get_date_arr(args.start_date, args.end_date, args.date_format),
+        date_format=args.date_format, holidays=args.special_weekends,
+        excluded_dates=args.excluding_dates
+    )
+    weekend_mask = (calendar.weekend_mask & ~calendar.get_date_mask(args.special_weekdays)) \
+                   | calendar.holiday_mask
+    num_shifts_arr = np.where(
+        weekend_mask, args.weekend_num_shifts, args.weekday_num_shifts
+    )[~calendar.excluded_mask]
 
     # creating pandas dataframe
-    df_dict = {"date": []} | {f"{shift}": [] for shift in args.shifts_names}
-    for date in date_arr:
-        df_dict["date"].append(date)
-        if (is_weekend(date, args.date_format) and \
-            not contain_same_day(date, args.special_weekdays, args.date_format)) \
-            or contain_same_day(date, args.special_weekends, args.date_format):
-            num_shifts = args.weekend_num_shifts
-        else:
-            num_shifts = args.weekday_num_shifts
-        for idx, shift in enumerate(args.shifts_names):
-            if idx < num_shifts:
-                df_dict[shift].append(1)
-            else:
-                df_dict[shift].append(0)
-    df = pd.DataFrame(df_dict)
-    df_writer = pd.ExcelWriter(data_url, datetime_format="mm/dd/yy")
-    df.to_excel(df_writer,index=False)
-    df_writer.save()
-    print(f"Shift requirements saved at {data_url}")
+    df_dict = {"date": list(np.array(calendar.date_list)[~calendar.excluded_mask])}
+    for idx, shift in enumerate(args.shifts_names):
+        df_dict[shift] = (idx < num_shifts_arr).astype(int)
+    return pd.DataFrame(df_dict)
 
 
 if __name__ == "__main__":
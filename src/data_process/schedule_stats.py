@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from .utils import get_run_length_mat, Calendar
+
+PREF_COUNT_KEYS = ["want_count", "ok_count", "no_pref_count", "cant_count"]
+
+
+def get_schedule_stats_df(solution_mat: np.ndarray, pref_tensor: np.ndarray,
+                          staff_list: list, shift_list: list,
+                          calendar: Calendar) -> pd.DataFrame:
+    """
+    Return the per staff stats of a (staff x day x shift) solution tensor:
+    Weekday/Weekend counts of every shift, total shifts, max consecutive
+    days and, with a preference tensor, counts of assigned shifts by
+    preference.
+    """
+    assigned_mat = np.asarray(solution_mat) > 0
+    weekend_mask = calendar.friday_saturday_mask
+    shift_stat_dict = {"RA": list(staff_list)}
+    for day_of_week, day_mask in [("Weekday", ~weekend_mask), ("Weekend", weekend_mask)]:
+        type_count_mat = assigned_mat[:, day_mask].sum(axis=1)
+        for s, shift_type in enumerate(shift_list):
+            shift_stat_dict[f"{day_of_week} - {shift_type}"] = type_count_mat[:, s]
+    shift_stat_dict["Total Shifts"] = assigned_mat.sum(axis=(1, 2))
+    shift_stat_dict["Max Consecutive Shifts"] = \
+        get_run_length_mat(assigned_mat.any(axis=2)).max(axis=1, initial=0)
+    if pref_tensor is not None:
+        pref_tensor = np.asarray(pref_tensor)
+        shift_stat_dict["want_count"] = (assigned_mat & (pref_tensor > 1)).sum(axis=(1, 2))
+        shift_stat_dict["ok_count"] = (assigned_mat & (pref_tensor == 1)).sum(axis=(1, 2))
+        shift_stat_dict["no_pref_count"] = (assigned_mat & (pref_tensor == 0)).sum(axis=(1, 2))
+        shift_stat_dict["cant_count"] = (assigned_mat & (pref_tensor < 0)).sum(axis=(1, 2))
+    return pd.DataFrame.from_dict(shift_stat_dict)
+
+
+def get_cant_assignments(solution_mat: np.ndarray, pref_tensor: np.ndarray) -> list:
+    """
+    Return the (staff, day, shift) indices of the assigned shifts with
+    negative preference.
+    """
+    cant_mat = (np.asarray(solution_mat) > 0) & (np.asarray(pref_tensor) < 0)
+    return list(zip(*np.nonzero(cant_mat)))
+
+
+def print_schedule_stats(stats_df: pd.DataFrame, shift_list: list) -> None:
+    """
+    Print the per staff stats returned by get_schedule_stats_df.
+    """
+    print("Staff shift taking statistics: ")
+    for _, row in stats_df.iterrows():
+        print(f"{row['RA']}: ")
+        print(f"\t#Total Shifts={row['Total Shifts']}")
+        for shift_type in shift_list:
+            for key in ["Weekend", "Weekday"]:
+                print(f"\t#{key} {shift_type}={row[f'{key} - {shift_type}']}")
+        for key in PREF_COUNT_KEYS:
+            if key in row:
+                print(f"\t#{key}={row[key]}")
+        print()
@@ -0,0 +1,149 @@
+import numpy as np
+from .utils import get_run_length_mat, Calendar
+
+
+class ScheduleVerifier():
+    """
+    Verify (staff x day x shift) solution tensors with whole-array reductions.
+    Everything that does not depend on the solution (unavailability mask,
+    max consecutive days, calendar masks) is compiled once at construction,
+    so verifying many candidate schedules is cheap.
+
+    verify() returns a list of violations, each a dict with "type", "staff",
+    "date", "shift", "value" and "message" keys ("staff", "date" and "shift"
+    are None when the violation is not about a single one of them).
+    """
+    def __init__(self, staff_list: list, shift_list: list, calendar: Calendar,
+                 unavailable_mask: np.ndarray=None,
+                 max_consecutive_dict: dict=None,
+                 shift_mat: np.ndarray=None) -> None:
+        self.staff_list = staff_list
+        self.shift_list = shift_list
+        self.calendar = calendar
+        self.num_people = len(self.staff_list)
+        self.num_days = len(self.calendar)
+        self.num_shifts = len(self.shift_list)
+        self.unavailable_mask = unavailable_mask
+        if max_consecutive_dict is not None:
+            self.max_consecutive_arr = np.array([
+                max_consecutive_dict[staff] for staff in self.staff_list
+            ], dtype=np.int64)
+        else:
+            self.max_consecutive_arr = None
+        self.shift_mat = None if shift_mat is None else np.asarray(shift_mat).astype(bool)
+
+    def verify(self, solution_mat: np.ndarray) -> list:
+        """
+        Return the list of violations of the solution tensor, empty if valid.
+        """
+        assert solution_mat.shape == (self.num_people, self.num_days, self.num_shifts), \
+            f"Solution shape {solution_mat.shape} does not match the schedule"
+        violation_arr = []
+        violation_arr += self._verify_one_staff_per_shift(solution_mat)
+        violation_arr += self._verify_one_shift_per_day(solution_mat)
+        if self.unavailable_mask is not None:
+            violation_arr += self._verify_unavailable(solution_mat)
+        if self.max_consecutive_arr is not None:
+            violation_arr += self._verify_max_consecutive(solution_mat)
+        violation_arr += self._verify_fairness(solution_mat)
+        return violation_arr
+
+    def _violation(self, violation_type, message, staff=None, date=None,
+                   shift=None, value=None) -> dict:
+        return {
+            "type": violation_type, "staff": staff, "date": date, "shift": shift,
+            "value": value, "message": message
+        }
+
+    def _verify_one_staff_per_shift(self, solution_mat) -> list:
+        """
+        Each shift has at most one staff, and exactly one if it exists in
+        the shift matrix.
+        """
+        violation_arr = []
+        count_mat = solution_mat.sum(axis=0)
+        if self.shift_mat is None:
+            invalid_mat = count_mat > 1
+        else:
+            invalid_mat = np.where(self.shift_mat, count_mat != 1, count_mat != 0)
+        for d, s in zip(*np.nonzero(invalid_mat)):
+            date, shift = self.calendar.date_list[d], self.shift_list[s]
+            violation_arr.append(self._violation(
+                "staff_per_shift", f"{count_mat[d, s]} staffs are scheduled for {date} {shift}",
+                date=date, shift=shift, value=int(count_mat[d, s])
+            ))
+        return violation_arr
+
+    def _verify_one_shift_per_day(self, solution_mat) -> list:
+        """
+        Each staff takes at most one shift per day.
+        """
+        violation_arr = []
+        count_mat = solution_mat.sum(axis=2)
+        for p, d in zip(*np.nonzero(count_mat > 1)):
+            staff, date = self.staff_list[p], self.calendar.date_list[d]
+            violation_arr.append(self._violation(
+                "shifts_per_day", f"Staff {staff} is scheduled for {count_mat[p, d]} shifts on {date}",
+                staff=staff, date=date, value=int(count_mat[p, d])
+            ))
+        return violation_arr
+
+    def _verify_unavailable(self, solution_mat) -> list:
+        """
+        No staff is scheduled for an unavailable shift.
+        """
+        violation_arr = []
+        for p, d, s in zip(*np.nonzero((solution_mat > 0) & self.unavailable_mask)):
+            staff, date, shift = self.staff_list[p], self.calendar.date_list[d], self.shift_list[s]
+            violation_arr.append(self._violation(
+                "unavailable", f"Staff {staff} is scheduled for {date} {shift}",
+                staff=staff, date=date, shift=shift
+            ))
+        return violation_arr
+
+    def _verify_max_consecutive(self, solution_mat) -> list:
+        """
+        No staff works more consecutive days than the maximum they accept.
+        """
+        violation_arr = []
+        max_run_arr = get_run_length_mat(solution_mat.any(axis=2)).max(axis=1, initial=0)
+        for p in np.nonzero(max_run_arr > self.max_consecutive_arr)[0]:
+            staff = self.staff_list[p]
+            violation_arr.append(self._violation(
+                "max_consecutive", f"Staff {staff} works {max_run_arr[p]} consecutive days "
+                f"(max {self.max_consecutive_arr[p]})",
+                staff=staff, value=int(max_run_arr[p])
+            ))
+        return violation_arr
+
+    def _verify_fairness(self, solution_mat) -> list:
+        """
+        Every staff takes between the floor and the ceiling of the per staff
+        average of each (shift, Weekend/Weekday) type and of all shifts. The
+        averages are over the shift matrix if given, else over the solution.
+        """
+        violation_arr = []
+        weekend_mask = self.calendar.friday_saturday_mask
+        if self.shift_mat is not None:
+            total_mat = self.shift_mat.astype(np.int64)
+        else:
+            total_mat = solution_mat.sum(axis=0)
+        count_dict = {
+            "Total": (solution_mat.sum(axis=(1, 2)), total_mat.sum())
+        }
+        for key, day_mask in [("Weekend", weekend_mask), ("Weekday", ~weekend_mask)]:
+            type_count_mat = solution_mat[:, day_mask].sum(axis=1)
+            type_total_arr = total_mat[day_mask].sum(axis=0)
+            for s, shift in enumerate(self.shift_list):
+                count_dict[f"{key} - {shift}"] = (type_count_mat[:, s], type_total_arr[s])
+        for key, (count_arr, total_count) in count_dict.items():
+            min_count = total_count // self.num_people
+            max_count = -(-total_count // self.num_people)
+            for p in np.nonzero((count_arr < min_count) | (count_arr > max_count))[0]:
+                staff = self.staff_list[p]
+                violation_arr.append(self._violation(
+                    "fairness", f"Staff {staff} takes {count_arr[p]} {key} shifts "
+                    f"(expected {min_count} - {max_count})",
+                    staff=staff, shift=key, value=int(count_arr[p])
+                ))
+        return violation_arr
@@ -0,0 +1,84 @@
+import os, importlib.util
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+EXCEL_EXTENSIONS = [".xlsx", ".xlsm"]
+TABLE_EXTENSIONS = EXCEL_EXTENSIONS + [".xls", ".csv", ".parquet"]
+
+
+def get_table_extension(file_path: str) -> str:
+    extension = os.path.splitext(file_path)[1].lower()
+    assert extension in TABLE_EXTENSIONS, \
+        f"Unsupported table file: {file_path} (supported: {TABLE_EXTENSIONS})"
+    if extension == ".parquet":
+        assert importlib.util.find_spec("pyarrow") is not None, \
+            f"Reading the .parquet table {file_path} needs pyarrow (pip install pyarrow)"
+    return extension
+
+
+def get_header_name(value, k: int):
+    """
+    Return the column name of a header cell, named like pandas if empty.
+    """
+    return f"Unnamed: {k}" if value is None else value
+
+
+def read_table_columns(file_path: str) -> list:
+    """
+    Return the column names of a workbook (first sheet), CSV or Parquet
+    table without loading its rows.
+    """
+    extension = get_table_extension(file_path)
+    if extension in EXCEL_EXTENSIONS:
+        import openpyxl
+        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            header = next(workbook.worksheets[0].iter_rows(max_row=1, values_only=True), ())
+        finally:
+            workbook.close()
+        return [get_header_name(value, k) for k, value in enumerate(header)]
+    if extension == ".csv":
+        return pd.read_csv(file_path, nrows=0).columns.tolist()
+    if extension == ".parquet":
+        import pyarrow.parquet as pq
+        return pq.read_schema(file_path).names
+    return pd.read_excel(file_path, nrows=0).columns.tolist()
+
+
+def read_table(file_path: str, columns: list=None) -> pd.DataFrame:
+    """
+    Read a workbook (first sheet), CSV or Parquet table. If columns is
+    given, only those columns are loaded (in table order). Workbooks are
+    streamed row by row by a read-only reader, and empty rows are dropped.
+    """
+    extension = get_table_extension(file_path)
+    usecols = None if columns is None else set(columns)
+    if extension == ".csv":
+        return pd.read_csv(file_path, usecols=usecols)
+    if extension == ".parquet":
+        return pd.read_parquet(file_path, columns=None if columns is None else list(columns))
+    if extension == ".xls":
+        return pd.read_excel(file_path, usecols=usecols)
+
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        row_iter = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [get_header_name(value, k) for k, value in enumerate(next(row_iter, ()))]
+        if usecols is None:
+            column_idx_arr = list(range(len(header)))
+        else:
+            column_idx_arr = [k for k, column in enumerate(header) if column in usecols]
+            missing_columns = usecols - {header[k] for k in column_idx_arr}
+            assert len(missing_columns) == 0, \
+                f"Columns not found in {file_path}: {sorted(missing_columns, key=str)}"
+        row_arr = []
+        for row in row_iter:
+            row = [row[k] if k < len(row) else None for k in column_idx_arr]
+            if any(value is not None for value in row):
+                row_arr.append(row)
+    finally:
+        workbook.close()
+    # same type inference and NA values as pd.read_excel
+    with TextParser([[header[k] for k in column_idx_arr]] + row_arr, header=0) as parser:
+        return parser.read()
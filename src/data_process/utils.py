@@ -1,4 +1,6 @@
-from datetime import datetime, timedelta
+import json
+import numpy as np
+from datetime import date, datetime, timedelta
 
 def get_date_arr(start_date, end_date, date_format="%m/%d/%y"):
     """
@@ -121,6 +123,76 @@ def keep_trail_bracket_str(s) -> str:
     return s[left_idx+1: right_idx]
 
 
+def get_shift_var_arr(shift_vars, shape) -> tuple:
+    """
+    Return the flat (staff x day x shift) cell indices of the shift
+    variables and the variables in the same order. Constant (pruned) cells
+    are skipped.
+    """
+    cell_arr = []
+    var_arr = []
+    for cell, shift_var in shift_vars.items():
+        if not isinstance(shift_var, int):
+            cell_arr.append(cell)
+            var_arr.append(shift_var)
+    cell_idx_arr = np.ravel_multi_index(np.array(cell_arr, dtype=np.int64).reshape(-1, 3).T, shape)
+    return cell_idx_arr, var_arr
+
+
+def get_solution_tensor(solver, shift_vars, shape) -> np.ndarray:
+    """
+    Extract the (staff x day x shift) solution tensor of the shift variables
+    from the solver response at once. Constant (pruned) cells and unsolved
+    models are 0.
+    """
+    cell_idx_arr, var_arr = get_shift_var_arr(shift_vars, shape)
+    solution_arr = np.array(solver.ResponseProto().solution, dtype=np.int8)
+    solution_mat = np.zeros(shape, dtype=np.int8)
+    if len(solution_arr) > 0:
+        var_idx_arr = np.array([shift_var.Index() for shift_var in var_arr], dtype=np.int64)
+        solution_mat.flat[cell_idx_arr] = solution_arr[var_idx_arr]
+    return solution_mat
+
+
+def get_incumbent_tensor(callback, cell_idx_arr, var_arr, shape) -> np.ndarray:
+    """
+    Read the (staff x day x shift) solution tensor of an incumbent in a
+    solution callback, from the flat cells and variables of
+    get_shift_var_arr built once before the solve.
+    """
+    solution_mat = np.zeros(shape, dtype=np.int8)
+    solution_mat.flat[cell_idx_arr] = [callback.Value(shift_var) for shift_var in var_arr]
+    return solution_mat
+
+
+def as_pref_tensor(pref_tensor) -> np.ndarray:
+    """
+    Return the (staff x day x shift) preference tensor as a contiguous int8
+    array indexed like the staff list. An int8 tensor (e.g. memory-mapped
+    from the input cache) is returned as is, without a copy.
+    """
+    pref_tensor = np.asarray(pref_tensor)
+    if pref_tensor.dtype != np.int8:
+        assert np.all(pref_tensor == np.rint(pref_tensor)), "Preferences must be integers"
+        pref_tensor = pref_tensor.astype(np.int8)
+    assert pref_tensor.ndim == 3, "Preference tensor must be (staff x day x shift)"
+    return pref_tensor
+
+
+def get_run_length_mat(work_mat) -> np.ndarray:
+    """
+    Return the length of the run of consecutive non-zero values ending at
+    every position of the last axis.
+
+    e.g.
+    get_run_length_mat([[1, 1, 0, 1]]) -> [[1, 2, 0, 1]]
+    """
+    work_mat = np.asarray(work_mat) != 0
+    count_mat = np.cumsum(work_mat, axis=-1)
+    reset_mat = np.maximum.accumulate(np.where(work_mat, 0, count_mat), axis=-1)
+    return count_mat - reset_mat
+
+
 def get_max_consecutive_len(arr):
     count = 0
     result = 0
@@ -134,4 +206,144 @@ def get_max_consecutive_len(arr):
         else:
             raise Exception("arr contain non-0/1 values")
          
-    return result
\ No newline at end of file
+    return result
+
+
+class Calendar:
+    """
+    Parsed calendar of a date list. Every date string is parsed once into
+    integer day ordinals, weekday codes (Monday=0 ... Sunday=6) and boolean
+    masks, which are then queried by row index instead of re-parsing strings.
+    """
+    day_of_week_list = [
+        "Monday", "Tuesday", "Wednesday", "Thursday", "Friday",
+        "Saturday", "Sunday"
+    ]
+
+    def __init__(self, date_list, date_format="%m/%d/%y",
+                 holidays=None, excluded_dates=None):
+        if holidays is None:
+            holidays = []
+        if excluded_dates is None:
+            excluded_dates = []
+        self.date_list = list(date_list)
+        self.date_format = date_format
+        self.num_days = len(self.date_list)
+        self.ordinal_arr = np.array([
+            datetime.strptime(date_str, date_format).toordinal()
+            for date_str in self.date_list
+        ], dtype=np.int64)
+        self.weekday_arr = ((self.ordinal_arr - 1) % 7).astype(np.int8)
+        self.date_idx_dict = {date_str: i for i, date_str in enumerate(self.date_list)}
+        self.ordinal_idx_dict = {
+            ordinal: i for i, ordinal in enumerate(self.ordinal_arr.tolist())
+        }
+        self.weekend_mask = self.weekday_arr >= 5
+        self.friday_saturday_mask = (self.weekday_arr == 4) | (self.weekday_arr == 5)
+        self.holiday_mask = self.get_date_mask(holidays)
+        self.excluded_mask = self.get_date_mask(excluded_dates)
+        for arr in [self.ordinal_arr, self.weekday_arr, self.weekend_mask,
+                    self.friday_saturday_mask, self.holiday_mask, self.excluded_mask]:
+            arr.setflags(write=False)
+
+    def __len__(self):
+        return self.num_days
+
+    def get_date_idx(self, date_str) -> int:
+        """
+        Return the row index of the date string, -1 if the date is not in
+        the calendar.
+        """
+        try:
+            return self.date_idx_dict[date_str]
+        except KeyError:
+            ordinal = datetime.strptime(date_str, self.date_format).toordinal()
+            return self.ordinal_idx_dict.get(ordinal, -1)
+
+    def contains(self, date_str) -> bool:
+        """
+        Return True if the calendar contains the same day as date_str.
+        """
+        return self.get_date_idx(date_str) > -1
+
+    def get_date_mask(self, date_str_arr) -> np.ndarray:
+        """
+        Return the boolean mask of the calendar days in date_str_arr.
+        """
+        mask = np.zeros(self.num_days, dtype=bool)
+        for date_str in date_str_arr:
+            idx = self.get_date_idx(date_str)
+            if idx > -1:
+                mask[idx] = True
+        return mask
+
+    def get_date(self, idx) -> date:
+        """
+        Return the date object of the idx-th day.
+        """
+        return date.fromordinal(int(self.ordinal_arr[idx]))
+
+    def get_day_of_week_str(self, idx) -> str:
+        """
+        Return day of week string of the idx-th day.
+        """
+        return self.day_of_week_list[self.weekday_arr[idx]]
+
+
+def get_unavailable_mask(unavailable_days_dict: dict, staff_list: list,
+                         shift_list: list, calendar: Calendar,
+                         strict: bool=False) -> np.ndarray:
+    """
+    Compile a {staff: {date or day of week: [shifts] or "ALL"}} dict, the
+    format of both staff_unavailable_days.json and
+    additional_staff_requirements.json, into the (staff x day x shift)
+    mask of the unavailable shifts. Day of week keys are expanded through
+    the calendar weekday array and take precedence over date keys. Dates
+    are matched in any spelling of the date format. A date outside the
+    calendar fails the strict check, and is otherwise ignored with a
+    warning.
+    """
+    staff_idx_dict = {staff: p for p, staff in enumerate(staff_list)}
+    shift_idx_dict = {shift: s for s, shift in enumerate(shift_list)}
+    unavailable_mask = np.zeros((len(staff_list), calendar.num_days, len(shift_list)), dtype=bool)
+    for staff, unavailable_dict in unavailable_days_dict.items():
+        assert staff in staff_idx_dict, f"Unavailable day staff {staff} is not in the staff list"
+        staff_idx = staff_idx_dict[staff]
+        for key, unavailable_shift in sorted(
+            unavailable_dict.items(), key=lambda item: item[0] in calendar.day_of_week_list
+        ):
+            if unavailable_shift == "ALL":
+                unavailable_shift = shift_list
+            assert isinstance(unavailable_shift, list), \
+                f"Unavailable shift for {staff} on {key} is not a list"
+            unknown_shift_arr = [shift for shift in unavailable_shift if shift not in shift_idx_dict]
+            assert len(unknown_shift_arr) == 0, \
+                f"Unavailable shift for {staff} on {key} is not a shift: {unknown_shift_arr}"
+            if key in calendar.day_of_week_list:
+                day_mask = calendar.weekday_arr == calendar.day_of_week_list.index(key)
+            else:
+                assert validate_datestr(key, calendar.date_format), \
+                    f"{staff}'s unavailable key ({key}) is not a valid date string or day of week"
+                date_idx = calendar.get_date_idx(key)
+                if date_idx == -1:
+                    assert not strict, f"{staff}'s unavailable date ({key}) is not in the schedule"
+                    print(f"Warning: {staff}'s unavailable date ({key}) is not in the schedule, ignored")
+                    continue
+                day_mask = date_idx
+            shift_mask = np.zeros(len(shift_list), dtype=bool)
+            shift_mask[[shift_idx_dict[shift] for shift in unavailable_shift]] = True
+            unavailable_mask[staff_idx, day_mask] = shift_mask
+    return unavailable_mask
+
+
+def load_unavailable_mask(unavailable_days_json: str, staff_list: list,
+                          shift_list: list, calendar: Calendar) -> np.ndarray:
+    """
+    Read an unavailable days json file and compile it by
+    get_unavailable_mask, nothing is unavailable without a file.
+    """
+    if unavailable_days_json is None:
+        return np.zeros((len(staff_list), calendar.num_days, len(shift_list)), dtype=bool)
+    with open(unavailable_days_json) as f:
+        unavailable_days_dict = json.load(f)
+    return get_unavailable_mask(unavailable_days_dict, staff_list, shift_list, calendar)
@@ -1,17 +1,63 @@
 import argparse, os
+from datetime import datetime
+import numpy as np
 import pandas as pd
-from ortools.sat.python import cp_model
-from args import get_shift_req_args
-from data_process.utils import get_date_arr, validate_datestr, \
-                               is_weekend, is_same_day, contain_same_day
-from data_process.preference_inputters import ElmSpring2022PreferenceInputer as PreferenceInputer
-from data_process.schedule_outputters import ElmScheduleOutputter as ScheduleOutputter
+from args import get_main_args, get_shift_req_args, get_solver_args
+from data_process.utils import Calendar
+from data_process.input_cache import InputCache
+from data_process.result_writer import ResultWriter, check_output_formats, load_solution_matrix
+from data_process.preference_inputters import PREFERENCE_INPUTTER_DICT
+from data_process.schedule_outputters import SCHEDULE_OUTPUTTER_DICT
 from data_process.schedule_matrix import get_schedule_matrix
-from solver.ScheduleModeler import ScheduleModeler
-from solver.utils import get_solution_matrix, print_staff_shedule_stats
+from profiler import StageProfiler
 
-def main(args):
-    # File setup
+# args the parsed inputs depend on besides the raw files
+INPUT_CACHE_ARG_KEYS = [
+    "date_format", "start_date", "end_date", "excluding_dates", "max_num_shifts",
+    "shifts_names", "weekday_num_shifts", "weekend_num_shifts",
+    "special_weekdays", "special_weekends"
+]
+
+def parse_inputs(args, raw_data_url, unavailable_day_url, profiler,
+                 shift_mat_df=None) -> dict:
+    """
+    Parse the schedule matrix (unless given), staff preferences and
+    unavailable days into the lists and arrays cached by InputCache.
+    """
+    if shift_mat_df is None:
+        with profiler.stage("schedule matrix"):
+            shift_mat_df = get_schedule_matrix(args)
+    date_list = shift_mat_df["date"].tolist()
+    shift_list = list(filter(
+        lambda x: x != "date", shift_mat_df.columns.tolist()
+    ))
+    calendar = Calendar(
+        date_list, date_format=args.date_format, holidays=args.special_weekends
+    )
+
+    with profiler.stage("preference input"):
+        processor = PREFERENCE_INPUTTER_DICT[args.inputter](
+            raw_data_url, shift_mat_df=shift_mat_df,
+            date_format=args.date_format, holidays=args.special_weekends, 
+            staff_unavailable_json=unavailable_day_url, calendar=calendar
+        )
+        staff_names = list(processor.get_staff_names())
+        pref_tensor = processor.get_all_pref_tensor()
+        max_consecutive_arr = np.array([
+            processor.get_staff_max_consecutive_shifts(staff_name) for staff_name in staff_names
+        ], dtype=np.int64)
+        unavailable_mask = processor.get_unavailable_mask()
+    return {
+        "date_list": date_list, "shift_list": shift_list, "staff_list": staff_names,
+        "shift_mat": shift_mat_df[shift_list].to_numpy(), "pref_tensor": pref_tensor,
+        "max_consecutive_arr": max_consecutive_arr, "unavailable_mask": unavailable_mask,
+    }
+
+
+def get_input_urls(args) -> tuple:
+    """
+    Return the raw preference file and unavailable day json paths of the run.
+    """
     data_dir = os.path.join(args.data_dir, args.data_name)
     if not os.path.exists(data_dir):
         os.makedirs(data_dir)
@@ -24,111 +70,262 @@ def main(args):
         f"Raw preference file: {raw_data_url} not found"
     assert os.path.isfile(unavailable_day_url), \
         f"Unavailable day json file: {unavailable_day_url} not found"
+    return raw_data_url, unavailable_day_url
 
-    # Input shift requirements
-    shift_mat_df = get_schedule_matrix(args)
-    date_list = shift_mat_df["date"].tolist()
-    shift_list = list(filter(
-        lambda x: x != "date", shift_mat_df.columns.tolist()
-    ))
 
-    # Input Staff preferences
-    processor = PreferenceInputer(
-        raw_data_url, shift_mat_df=shift_mat_df,
-        date_format=args.date_format, holidays=args.special_weekends, 
-        staff_unavailable_json=unavailable_day_url
+def get_input_cache_key(args) -> str:
+    """
+    Return the input cache key of the raw input files and parsing args of
+    the run.
+    """
+    raw_data_url, unavailable_day_url = get_input_urls(args)
+    cache_file_url_list = [
+        raw_data_url, unavailable_day_url,
+        os.path.join(args.data_dir, args.data_name, "schedule_matrix.xlsx")
+    ]
+    cache_arg_dict = {key: getattr(args, key) for key in INPUT_CACHE_ARG_KEYS}
+    cache_arg_dict["inputter"] = args.inputter
+    return InputCache(os.path.join(args.data_dir, "input_cache")).get_key(
+        cache_file_url_list, cache_arg_dict
     )
-    staff_names = processor.get_staff_names()
-    staff_pref_matrices = {}
-    staff_max_consecutive_dict = {}
-    for staff_name in staff_names:
-        pref_matrix = processor.get_staff_pref_matrix(staff_name)
-        max_consecutive = processor.get_staff_max_consecutive_shifts(staff_name)
-        staff_pref_matrices[staff_name] = pref_matrix
-        staff_max_consecutive_dict[staff_name] = max_consecutive
-
-    modeler = ScheduleModeler(
-        shift_mat_df=shift_mat_df, 
-        pref_mat_dict=staff_pref_matrices,
-        staff_list=staff_names, 
-        date_format=args.date_format,
-        max_consecutive_dict=staff_max_consecutive_dict,
+
+
+def load_inputs(args, profiler) -> dict:
+    """
+    Return the parsed inputs of the run, loaded from the input cache if the
+    raw files and parsing args are unchanged, parsed and cached otherwise.
+    """
+    # File setup
+    raw_data_url, unavailable_day_url = get_input_urls(args)
+
+    # Input shift requirements, staff preferences & unavailable days
+    input_cache = None
+    if not args.no_input_cache:
+        input_cache = InputCache(
+            os.path.join(args.data_dir, "input_cache"), max_size_mb=args.input_cache_size_mb
+        )
+    input_dict = None
+    if input_cache is not None:
+        # hashes the raw files, so it is computed once for the load and the save
+        with profiler.stage("input cache key"):
+            input_cache_key = get_input_cache_key(args)
+        if not args.overwrite:
+            with profiler.stage("input cache load"):
+                input_dict = input_cache.load(input_cache_key, mmap_mode="r")
+            if input_dict is not None:
+                print(f"Parsed inputs loaded from {input_cache.cache_dir}")
+    if input_dict is None:
+        input_dict = parse_inputs(args, raw_data_url, unavailable_day_url, profiler)
+        if input_cache is not None:
+            input_cache.save(input_cache_key, input_dict)
+    return input_dict
+
+
+def main(args):
+    assert args.inputter in PREFERENCE_INPUTTER_DICT, \
+        f"Invalid inputter: {args.inputter} (supported: {list(PREFERENCE_INPUTTER_DICT)})"
+    assert args.outputter in SCHEDULE_OUTPUTTER_DICT, \
+        f"Invalid outputter: {args.outputter} (supported: {list(SCHEDULE_OUTPUTTER_DICT)})"
+    check_output_formats(args.output_formats)
+    assert not (args.resume and args.hint_from is not None), \
+        "--resume hints the checkpoint solution, it can not be combined with --hint_from"
+    assert args.num_solutions == 1 or not (args.checkpoint or args.resume), \
+        "--num_solutions can not be combined with --checkpoint or --resume"
+    if args.window_days > 0:
+        assert args.hint_from is None and not args.resume and not args.checkpoint \
+            and args.num_solutions == 1, \
+            "--window_days can not be combined with --hint_from, --resume, --checkpoint " \
+            "or --num_solutions"
+    # the solver modules import ortools, so only the solve imports them
+    from solver.ScheduleModeler import ScheduleModeler
+    from solver.SolutionCheckpointer import SolutionCheckpointer, load_checkpoint
+    from solver.RollingHorizonSolver import RollingHorizonSolver
+    from solver.DiverseScheduleSolver import DiverseScheduleSolver
+    from solver.utils import get_solver_parameters, get_cp_solver, save_solver_parameters, \
+                             get_solver_stats
+    profiler = StageProfiler(enabled=args.profile)
+
+    # Input shift requirements, staff preferences & unavailable days
+    data_dir = os.path.join(args.data_dir, args.data_name)
+    input_dict = load_inputs(args, profiler)
+
+    date_list, shift_list = input_dict["date_list"], input_dict["shift_list"]
+    staff_names, pref_tensor = input_dict["staff_list"], input_dict["pref_tensor"]
+    unavailable_mask = input_dict["unavailable_mask"]
+    shift_mat_df = pd.DataFrame({"date": date_list})
+    for shift_idx, shift in enumerate(shift_list):
+        shift_mat_df[shift] = input_dict["shift_mat"][:, shift_idx]
+    calendar = Calendar(
+        date_list, date_format=args.date_format, holidays=args.special_weekends
     )
-    schedule_model, shift_vars = modeler.get_model()
-
-    # solving cp-model
-    solver = cp_model.CpSolver()
-    # solver.parameters.linearization_level = 0
-    solver.parameters.max_time_in_seconds = args.max_solve_time
-    # solver.parameters.enumerate_all_solutions = True
-    print(f"solving... (max time={args.max_solve_time})")
-    solver.Solve(schedule_model)
-    print(solver.StatusName())
-
-    if solver.StatusName() != "INFEASIBLE":
-        schedule_outputter = ScheduleOutputter(
-            solver=solver, shift_vars=shift_vars, 
-            date_list=date_list, staff_list=staff_names, 
-            shift_list=shift_list, date_format=args.date_format,
-            pref_mat_dict=staff_pref_matrices, 
-            staff_unavailable_days_json=unavailable_day_url
+    staff_max_consecutive_dict = {}
+    for staff_idx, staff_name in enumerate(staff_names):
+        staff_max_consecutive_dict[staff_name] = int(input_dict["max_consecutive_arr"][staff_idx])
+
+    solution_dir = os.path.join(data_dir, "solutions")
+    solver_param_dict = get_solver_parameters(args)
+    if args.window_days > 0:
+        # solving overlapping windows
+        rolling_solver = RollingHorizonSolver(
+            shift_mat_df=shift_mat_df,
+            pref_tensor=pref_tensor,
+            staff_list=staff_names,
+            date_format=args.date_format,
+            max_consecutive_dict=staff_max_consecutive_dict,
+            calendar=calendar,
+            window_days=args.window_days,
+            overlap_days=args.overlap_days,
+            solver_param_dict=solver_param_dict,
+            sparse=args.sparse_model,
+            max_consecutive_encoding=args.max_consecutive_encoding,
+            negative_pref_weight=args.negative_pref_weight,
         )
-        schedule_outputter.verify_schedule()
-        stats_df = schedule_outputter.get_schedule_stats(verbose=False)
-        schedule_df = schedule_outputter.get_schedule_df()
-        print("Solution Schedule Stats:")
-        print(stats_df)
-        
-
-        solution_dir = os.path.join(data_dir, "solutions")
-        if not os.path.exists(solution_dir):
-            os.makedirs(solution_dir)
-        solution_excel_url = os.path.join(solution_dir, args.solution_file_name)
-        states_excel_url = os.path.join(solution_dir, "states.xlsx")
-        
-        df_writer = pd.ExcelWriter(solution_excel_url, datetime_format=args.date_format)
-        schedule_df.to_excel(df_writer,index=False)
-        df_writer.save()
-        print("Schedule saved to {}".format(solution_excel_url))
-        df_writer = pd.ExcelWriter(states_excel_url, datetime_format=args.date_format)
-        stats_df.to_excel(df_writer,index=False)
-        df_writer.save()
-        print("Schedule stats saved to {}".format(states_excel_url))
-
-
-    
+        print(f"solving {len(rolling_solver.get_windows())} windows... "
+              f"(max time={args.max_solve_time})")
+        with profiler.stage("rolling horizon solve"):
+            solution_mat_arr = [rolling_solver.solve()]
+        for window_idx, solver_stats in enumerate(rolling_solver.solver_stats_list):
+            profiler.add_solver_stats(f"window {window_idx}", solver_stats)
+        solver_stats_arr = [rolling_solver.get_solver_stats(solution_mat_arr[0])]
+        solver, shift_vars = None, None
+        status_name = rolling_solver.get_status_name()
+        print(status_name)
+    else:
+        with profiler.stage("model build"):
+            modeler = ScheduleModeler(
+                shift_mat_df=shift_mat_df, 
+                pref_tensor=pref_tensor,
+                staff_list=staff_names, 
+                date_format=args.date_format,
+                max_consecutive_dict=staff_max_consecutive_dict,
+                calendar=calendar,
+                sparse=args.sparse_model,
+                max_consecutive_encoding=args.max_consecutive_encoding,
+                negative_pref_weight=args.negative_pref_weight,
+            )
+            schedule_model, shift_vars = modeler.get_model()
+        if args.hint_from is not None:
+            hint_url = os.path.join(solution_dir, args.hint_from)
+            assert os.path.isfile(hint_url), f"Hint file: {hint_url} not found"
+            hint_mat = load_solution_matrix(hint_url, staff_names, shift_list, calendar)
+            modeler.add_solution_hint(schedule_model, shift_vars, hint_mat)
+            print(f"Solution hint loaded from {hint_url}")
+
+        # resume from checkpoint
+        checkpoint_url = os.path.join(solution_dir, "checkpoint.npz")
+        prev_elapsed_time = 0.0
+        if args.resume:
+            assert os.path.isfile(checkpoint_url), f"Checkpoint: {checkpoint_url} not found"
+            checkpoint = load_checkpoint(checkpoint_url)
+            assert checkpoint["solution_mat"].shape == (len(staff_names), len(date_list), len(shift_list)), \
+                "Checkpoint solution does not match the schedule"
+            modeler.add_solution_hint(schedule_model, shift_vars, checkpoint["solution_mat"])
+            prev_elapsed_time = checkpoint["elapsed_time"]
+            remaining_time = args.max_solve_time - prev_elapsed_time
+            if remaining_time < 1:
+                print("Solve time budget is used up, solving for 1 more second")
+                remaining_time = 1
+            solver_param_dict["max_time_in_seconds"] = remaining_time
+            print(f"Resuming from {checkpoint_url} (objective={checkpoint['objective']}, "
+                  f"bound={checkpoint['best_bound']}, elapsed time={prev_elapsed_time:.1f})")
+
+        # solving cp-model
+        if args.num_solutions > 1:
+            diverse_solver = DiverseScheduleSolver(
+                schedule_model, shift_vars, (len(staff_names), len(date_list), len(shift_list)),
+                solver_param_dict=solver_param_dict, num_solutions=args.num_solutions,
+                min_distance=args.min_distance
+            )
+            print(f"solving {args.num_solutions} diverse schedules... "
+                  f"(max time={args.max_solve_time} each)")
+            with profiler.stage("diverse solve"):
+                solution_mat_arr = diverse_solver.solve()
+            solver_stats_arr = diverse_solver.solver_stats_list
+            for solution_idx, solver_stats in enumerate(solver_stats_arr):
+                profiler.add_solver_stats(f"schedule {solution_idx + 1}", solver_stats)
+            solver, status_name = None, diverse_solver.status_list[0]
+        else:
+            solver = get_cp_solver(solver_param_dict)
+            print(f"solving... (max time={solver.parameters.max_time_in_seconds})")
+            with profiler.stage("solve"):
+                if args.checkpoint or args.resume:
+                    if not os.path.exists(solution_dir):
+                        os.makedirs(solution_dir)
+                    checkpointer = SolutionCheckpointer(
+                        shift_vars, (len(staff_names), len(date_list), len(shift_list)),
+                        checkpoint_url, prev_elapsed_time=prev_elapsed_time
+                    )
+                    solver.Solve(schedule_model, checkpointer)
+                    checkpointer.save_final(solver)
+                else:
+                    solver.Solve(schedule_model)
+            profiler.add_solver_stats("solve", get_solver_stats(solver))
+            print(solver.StatusName())
+            status_name = solver.StatusName()
+            solution_mat_arr = [None]
+            solver_stats_arr = [get_solver_stats(solver)]
+
+    result_dict = {"data_name": args.data_name, "status": status_name}
+    if status_name in ["OPTIMAL", "FEASIBLE"]:
+        for solution_idx, solution_mat in enumerate(solution_mat_arr):
+            # number the output files of every schedule when there are several
+            file_name = os.path.splitext(args.solution_file_name)[0]
+            if len(solution_mat_arr) > 1:
+                file_name = f"{file_name}_{solution_idx + 1}"
+                print(f"Schedule {solution_idx + 1}:")
+            with profiler.stage("verification"):
+                schedule_outputter = SCHEDULE_OUTPUTTER_DICT[args.outputter](
+                    solver=solver, shift_vars=shift_vars, 
+                    date_list=date_list, staff_list=staff_names, 
+                    shift_list=shift_list, date_format=args.date_format,
+                    pref_tensor=pref_tensor, 
+                    calendar=calendar, solution_mat=solution_mat,
+                    max_consecutive_dict=staff_max_consecutive_dict,
+                    shift_mat=shift_mat_df[shift_list].to_numpy(),
+                    unavailable_mask=unavailable_mask
+                )
+                assert schedule_outputter.verify_schedule(), "Solution schedule is invalid"
+            with profiler.stage("stats"):
+                stats_df = schedule_outputter.get_schedule_stats(verbose=False)
+                schedule_df = schedule_outputter.get_schedule_df()
+            print("Solution Schedule Stats:")
+            print(stats_df)
+
+            metadata = {
+                "data_name": args.data_name,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "start_date": date_list[0], "end_date": date_list[-1],
+                "num_staffs": len(staff_names), "num_days": len(date_list),
+                "num_shifts": len(shift_list), "status": status_name,
+                "want_count": int(stats_df["want_count"].sum()),
+                "cant_count": int(stats_df["cant_count"].sum()),
+                "solver_parameters": solver_param_dict,
+            }
+            metadata.update(solver_stats_arr[solution_idx])
+            result_writer = ResultWriter(
+                solution_dir, file_name=file_name, formats=args.output_formats
+            )
+            with profiler.stage("output writing"):
+                for result_url in result_writer.write(
+                    schedule_df, stats_df, schedule_outputter.get_schedule_matrix(), metadata
+                ):
+                    print("Results saved to {}".format(result_url))
+            if solution_idx == 0:
+                result_dict = metadata
+        solver_params_url = os.path.join(solution_dir, "solver_parameters.json")
+        save_solver_parameters(solver_param_dict, solver_params_url)
+        print("Solver parameters saved to {}".format(solver_params_url))
+    profiler.save(solution_dir)
+    if status_name not in ["OPTIMAL", "FEASIBLE"]:
+        raise RuntimeError(f"No schedule found, solver status: {status_name}")
+    return result_dict
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="shift requirement generator flags")
-    parser.add_argument(
-        "--data_dir", type=str, default="../data/", help="data directory"
-    )
-    parser.add_argument(
-        "--data_name", type=str, required=True,
-        help="name of the data to generate shift requirement for",
-    )
-    parser.add_argument(
-        "--date_format", type=str, help="format string for start/end date",
-        default="%m/%d/%y"
-    )
-    parser.add_argument(
-        "--raw_pref_file_name", type=str, help="name of the raw preference file",
-        required=True
-    )
-    parser.add_argument(
-        "--unavailble_day_json_file_name", type=str,
-        help="name of the json file containing unavailable days for each staff",
-    ),
-    parser.add_argument(
-        "--solution_file_name", type=str, help="name of the solution file",
-        default="solution.xlsx"
-    )
-    parser.add_argument(
-        "--max_solve_time", type=int, help="max time in seconds to solve schedule",
-        default=10
-    )
+    get_main_args(parser)
     get_shift_req_args(parser)
+    get_solver_args(parser)
 
     args = parser.parse_args()
     main(args)
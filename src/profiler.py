@@ -0,0 +1,79 @@
+import os, sys, time, json, resource, tracemalloc
+from contextlib import contextmanager
+import pandas as pd
+
+
+def get_peak_rss_mb() -> float:
+    """
+    Return the peak resident set size of the process in MB.
+    """
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KB on Linux
+    if sys.platform == "darwin":
+        return peak_rss / 1024 ** 2
+    return peak_rss / 1024
+
+
+class StageProfiler():
+    """
+    Record the wall time, CPU time, peak RSS and Python allocations
+    (tracemalloc) of each stage of a run, plus the stats of its solves.
+    A disabled profiler records nothing and adds no overhead, so stages
+    can be wrapped unconditionally.
+
+    with profiler.stage("model build"):
+        ...
+    """
+    def __init__(self, enabled: bool=True) -> None:
+        self.enabled = enabled
+        self.stage_arr = []
+        self.solver_stats_arr = []
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+        tracemalloc.reset_peak()
+        start_alloc, _ = tracemalloc.get_traced_memory()
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            end_alloc, peak_alloc = tracemalloc.get_traced_memory()
+            self.stage_arr.append({
+                "stage": name,
+                "wall_time": time.perf_counter() - start_wall,
+                "cpu_time": time.process_time() - start_cpu,
+                "peak_rss_mb": get_peak_rss_mb(),
+                "alloc_mb": (end_alloc - start_alloc) / 1024 ** 2,
+                "peak_alloc_mb": (peak_alloc - start_alloc) / 1024 ** 2,
+            })
+
+    def add_solver_stats(self, name: str, solver_stats: dict) -> None:
+        """
+        Record the stats (see get_solver_stats) of a solve.
+        """
+        if self.enabled:
+            self.solver_stats_arr.append({"solve": name, **solver_stats})
+
+    def save(self, output_dir: str, file_name: str="profile") -> None:
+        """
+        Save the records to <file_name>.json (stages and solves) and the
+        stages to <file_name>.csv in output_dir.
+        """
+        if not self.enabled:
+            return
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        json_url = os.path.join(output_dir, f"{file_name}.json")
+        with open(json_url, "w") as f:
+            json.dump({
+                "stages": self.stage_arr, "solves": self.solver_stats_arr
+            }, f, indent=4)
+        pd.DataFrame(self.stage_arr).to_csv(
+            os.path.join(output_dir, f"{file_name}.csv"), index=False
+        )
+        print("Stage profile saved to {}".format(json_url))
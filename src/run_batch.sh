@@ -0,0 +1,4 @@
+python batch.py \
+    --manifest "batch_manifest.json" \
+    --log_dir "../data/batch_logs" \
+    --summary_file "../data/batch_summary.csv"
@@ -0,0 +1,6 @@
+python service.py \
+    --port 8765 \
+    --defaults "service_defaults.json" \
+    --max_parallel_jobs 2 \
+    --max_job_time 300 \
+    --max_cached_inputs 8
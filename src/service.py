@@ -0,0 +1,446 @@
+import argparse, os, json, time, threading, traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+import pandas as pd
+from batch import get_main_parser, get_job_argv
+from main import load_inputs, get_input_cache_key
+from profiler import StageProfiler
+from data_process.utils import Calendar
+from data_process.result_writer import load_solution_matrix
+from data_process.preference_inputters import PREFERENCE_INPUTTER_DICT
+from data_process.schedule_outputters import SCHEDULE_OUTPUTTER_DICT
+from solver.ScheduleModeler import ScheduleModeler
+from solver.IncumbentRecorder import IncumbentRecorder
+from solver.utils import get_solver_parameters, get_cp_solver, get_solver_stats
+
+JOB_TYPES = ["solve", "verify", "stats"]
+FINISHED_STATUSES = ["DONE", "ERROR", "CANCELLED"]
+
+
+def json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+class ScheduleJob():
+    """
+    A solve, verify or stats job of the service. Its status goes QUEUED ->
+    RUNNING -> DONE / ERROR / CANCELLED, and condition is notified on every
+    status change and incumbent.
+    """
+    def __init__(self, job_id: int, job_type: str, arg_dict: dict,
+                 time_budget: float=None, solution_job: int=None):
+        self.job_id = job_id
+        self.job_type = job_type
+        self.arg_dict = arg_dict
+        self.time_budget = time_budget
+        self.solution_job = solution_job
+        self.status = "QUEUED"
+        self.condition = threading.Condition()
+        self.solver = None
+        self.recorder = None
+        # set by the service thread, read by the solver callback thread
+        self.cancel_event = threading.Event()
+        self.solution_mat = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def set_status(self, status: str) -> None:
+        with self.condition:
+            self.status = status
+            if status == "RUNNING":
+                self.started_at = time.time()
+            elif status in FINISHED_STATUSES:
+                self.finished_at = time.time()
+            self.condition.notify_all()
+
+    def get_incumbents(self, start: int=0) -> list:
+        if self.recorder is None:
+            return []
+        return self.recorder.incumbent_arr[start:]
+
+    def to_dict(self, incumbent_start: int=0) -> dict:
+        with self.condition:
+            return {
+                "job": self.job_id, "type": self.job_type, "status": self.status,
+                "data_name": self.arg_dict.get("data_name"),
+                "time_budget": self.time_budget,
+                "created_at": self.created_at, "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "incumbents": self.get_incumbents(incumbent_start),
+                "result": self.result, "error": self.error,
+            }
+
+
+class ScheduleService():
+    """
+    Run solve, verify and stats jobs on a bounded thread pool. The parsed
+    inputs and calendar of a run are kept in memory (least recently used
+    first out) under the input cache key, so jobs on unchanged raw files
+    and args skip the parsing. Every solve is capped at max_job_time
+    seconds.
+    """
+    def __init__(self, default_arg_dict: dict=None, max_parallel_jobs: int=2,
+                 max_job_time: float=300, max_cached_inputs: int=8) -> None:
+        self.default_arg_dict = default_arg_dict if default_arg_dict is not None else {}
+        self.max_job_time = max_job_time
+        self.max_cached_inputs = max_cached_inputs
+        self.executor = ThreadPoolExecutor(max_workers=max_parallel_jobs)
+        self.job_dict = {}
+        self.future_dict = {}
+        self.input_dict_cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_job(self, job_id: int) -> ScheduleJob:
+        with self.lock:
+            return self.job_dict.get(job_id)
+
+    def get_job_arr(self) -> list:
+        with self.lock:
+            return list(self.job_dict.values())
+
+    def submit(self, job_type: str, arg_dict: dict, time_budget: float=None,
+               solution_job: int=None) -> ScheduleJob:
+        assert job_type in JOB_TYPES, f"Invalid job type: {job_type} (supported: {JOB_TYPES})"
+        if time_budget is not None:
+            assert time_budget > 0, "Time budget must be positive"
+        job_arg_dict = dict(self.default_arg_dict)
+        job_arg_dict.update(arg_dict)
+        assert "data_name" in job_arg_dict, "Job has no data_name"
+        with self.lock:
+            if solution_job is not None:
+                assert solution_job in self.job_dict, f"Solution job {solution_job} not found"
+                # waiting for it in a worker could take the worker it needs
+                solution_job_status = self.job_dict[solution_job].status
+                assert solution_job_status in FINISHED_STATUSES, \
+                    f"Solution job {solution_job} is {solution_job_status}, " \
+                    f"submit this job once it is finished"
+            job = ScheduleJob(len(self.job_dict), job_type, job_arg_dict, time_budget, solution_job)
+            self.job_dict[job.job_id] = job
+            self.future_dict[job.job_id] = self.executor.submit(self.run_job, job)
+        return job
+
+    def cancel(self, job_id: int) -> ScheduleJob:
+        """
+        Cancel a queued job, or stop the search of a running solve, which
+        is then CANCELLED with the result of its best incumbent. A solve
+        cancelled while it starts is stopped at its next incumbent.
+        """
+        job = self.get_job(job_id)
+        if job is None:
+            return None
+        with job.condition:
+            job.cancel_event.set()
+            if job.solver is not None:
+                job.solver.StopSearch()
+        if self.future_dict[job_id].cancel():
+            job.set_status("CANCELLED")
+        return job
+
+    def shutdown(self) -> None:
+        """
+        Cancel the unfinished jobs and wait for the running ones to stop.
+        """
+        for job in self.get_job_arr():
+            if job.status not in FINISHED_STATUSES:
+                self.cancel(job.job_id)
+        self.executor.shutdown(wait=True)
+
+    def get_inputs(self, args) -> dict:
+        """
+        Return the parsed inputs of the job args with their calendar and
+        schedule matrix, from memory if the raw files and args are unchanged.
+        """
+        key = get_input_cache_key(args)
+        with self.lock:
+            if key in self.input_dict_cache:
+                self.input_dict_cache.move_to_end(key)
+                return self.input_dict_cache[key]
+        input_dict = dict(load_inputs(args, StageProfiler(enabled=False)))
+        input_dict["calendar"] = Calendar(
+            input_dict["date_list"], date_format=args.date_format, holidays=args.special_weekends
+        )
+        shift_mat_df = pd.DataFrame({"date": input_dict["date_list"]})
+        for shift_idx, shift in enumerate(input_dict["shift_list"]):
+            shift_mat_df[shift] = input_dict["shift_mat"][:, shift_idx]
+        input_dict["shift_mat_df"] = shift_mat_df
+        input_dict["max_consecutive_dict"] = {
+            staff: int(input_dict["max_consecutive_arr"][p])
+            for p, staff in enumerate(input_dict["staff_list"])
+        }
+        with self.lock:
+            self.input_dict_cache[key] = input_dict
+            while len(self.input_dict_cache) > self.max_cached_inputs:
+                self.input_dict_cache.popitem(last=False)
+        return input_dict
+
+    def run_job(self, job: ScheduleJob) -> None:
+        if job.cancel_event.is_set():
+            job.set_status("CANCELLED")
+            return
+        job.set_status("RUNNING")
+        try:
+            args = get_main_parser().parse_args(get_job_argv(job.arg_dict))
+            assert args.inputter in PREFERENCE_INPUTTER_DICT, \
+                f"Invalid inputter: {args.inputter} (supported: {list(PREFERENCE_INPUTTER_DICT)})"
+            assert args.outputter in SCHEDULE_OUTPUTTER_DICT, \
+                f"Invalid outputter: {args.outputter} (supported: {list(SCHEDULE_OUTPUTTER_DICT)})"
+            input_dict = self.get_inputs(args)
+            if job.job_type == "solve":
+                solution_mat, result = self.run_solve(job, args, input_dict)
+            else:
+                solution_mat, result = self.get_job_solution(job, args, input_dict), {}
+            if solution_mat is not None:
+                result.update(self.get_solution_result(job, args, input_dict, solution_mat))
+            with job.condition:
+                job.solution_mat = solution_mat
+                job.result = result
+            job.set_status("CANCELLED" if job.cancel_event.is_set() else "DONE")
+        except (Exception, SystemExit) as e:
+            traceback.print_exc()
+            with job.condition:
+                job.error = f"{type(e).__name__}: {e}"
+            job.set_status("ERROR")
+
+    def run_solve(self, job: ScheduleJob, args, input_dict: dict) -> tuple:
+        """
+        Solve the job within its time budget, recording every incumbent.
+        Return the solution matrix (None without a solution) and the solver
+        stats.
+        """
+        modeler = ScheduleModeler(
+            shift_mat_df=input_dict["shift_mat_df"], pref_tensor=input_dict["pref_tensor"],
+            staff_list=input_dict["staff_list"], date_format=args.date_format,
+            max_consecutive_dict=input_dict["max_consecutive_dict"],
+            calendar=input_dict["calendar"], sparse=args.sparse_model,
+            max_consecutive_encoding=args.max_consecutive_encoding,
+            negative_pref_weight=args.negative_pref_weight, verbose=False
+        )
+        model, shift_vars = modeler.get_model()
+        solution_shape = input_dict["pref_tensor"].shape
+        if job.solution_job is not None:
+            modeler.add_solution_hint(
+                model, shift_vars, self.get_job_solution(job, args, input_dict)
+            )
+        solver_param_dict = get_solver_parameters(args)
+        time_budget = job.time_budget if job.time_budget is not None else args.max_solve_time
+        solver_param_dict["max_time_in_seconds"] = min(time_budget, self.max_job_time)
+        # Ctrl-C stops the server, which then cancels the running solves
+        solver_param_dict["catch_sigint_signal"] = False
+        solver = get_cp_solver(solver_param_dict)
+        recorder = IncumbentRecorder(
+            shift_vars, solution_shape, condition=job.condition, stop_event=job.cancel_event
+        )
+        with job.condition:
+            job.solver = solver
+            job.recorder = recorder
+            if job.cancel_event.is_set():
+                return None, {"status": "CANCELLED"}
+        solver.Solve(model, recorder)
+        result = get_solver_stats(solver)
+        result["solver_parameters"] = solver_param_dict
+        return recorder.solution_mat, result
+
+    def get_job_solution(self, job: ScheduleJob, args, input_dict: dict) -> np.ndarray:
+        """
+        Return the solution the job checks: the solution of its solution
+        job, which is finished when the job is submitted, or the saved
+        --solution_file_name of the run.
+        """
+        if job.solution_job is not None:
+            solution_job = self.get_job(job.solution_job)
+            assert solution_job.solution_mat is not None, \
+                f"Solution job {job.solution_job} has no solution"
+            assert solution_job.solution_mat.shape == input_dict["pref_tensor"].shape, \
+                f"Solution job {job.solution_job} is not a solution of this schedule"
+            return solution_job.solution_mat
+        solution_url = os.path.join(
+            args.data_dir, args.data_name, "solutions", args.solution_file_name
+        )
+        assert os.path.isfile(solution_url), f"Solution file: {solution_url} not found"
+        return load_solution_matrix(
+            solution_url, input_dict["staff_list"], input_dict["shift_list"],
+            input_dict["calendar"]
+        )
+
+    def get_solution_result(self, job: ScheduleJob, args, input_dict: dict,
+                            solution_mat: np.ndarray) -> dict:
+        """
+        Return the violations, stats and schedule of a solution, as the
+        job type needs them.
+        """
+        schedule_outputter = SCHEDULE_OUTPUTTER_DICT[args.outputter](
+            solver=None, shift_vars=None, date_list=input_dict["date_list"],
+            staff_list=input_dict["staff_list"], shift_list=input_dict["shift_list"],
+            date_format=args.date_format, pref_tensor=input_dict["pref_tensor"],
+            calendar=input_dict["calendar"], solution_mat=solution_mat,
+            max_consecutive_dict=input_dict["max_consecutive_dict"],
+            shift_mat=input_dict["shift_mat"], unavailable_mask=input_dict["unavailable_mask"]
+        )
+        violation_arr = schedule_outputter.get_schedule_violations()
+        result = {
+            "valid": len(violation_arr) == 0,
+            "violations": [violation["message"] for violation in violation_arr],
+        }
+        if job.job_type == "verify":
+            return result
+        stats_df = schedule_outputter.get_schedule_stats(verbose=False)
+        result.update({
+            "want_count": int(stats_df["want_count"].sum()),
+            "cant_count": int(stats_df["cant_count"].sum()),
+            "stats": stats_df.to_dict(orient="records"),
+        })
+        if job.job_type == "solve":
+            result["schedule"] = schedule_outputter.get_schedule_df().to_dict(orient="records")
+        return result
+
+
+class ScheduleRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON API of a ScheduleService:
+        - POST /jobs {"type", "args", "time_budget", "solution_job"}: submit a job
+        - GET /jobs: list the jobs without their incumbents and results
+        - GET /jobs/<id>?since=k: poll a job and its incumbents from the k-th
+        - GET /jobs/<id>/stream: stream the incumbents of a job as json lines,
+          then the finished job
+        - DELETE /jobs/<id>: cancel a job
+    """
+    service = None
+
+    def send_json(self, status: int, content) -> None:
+        body = json.dumps(content, default=json_default).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def get_path_job(self, path_arr: list) -> ScheduleJob:
+        try:
+            job = self.service.get_job(int(path_arr[1]))
+        except ValueError:
+            job = None
+        if job is None:
+            self.send_json(404, {"error": f"Job {path_arr[1]} not found"})
+        return job
+
+    def do_POST(self):
+        path_arr = urlparse(self.path).path.strip("/").split("/")
+        if path_arr != ["jobs"]:
+            return self.send_json(404, {"error": f"Unknown path: {self.path}"})
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            job = self.service.submit(
+                request.get("type", "solve"), request.get("args", {}),
+                time_budget=request.get("time_budget"),
+                solution_job=request.get("solution_job")
+            )
+        except (ValueError, AssertionError) as e:
+            return self.send_json(400, {"error": f"{type(e).__name__}: {e}"})
+        self.send_json(201, job.to_dict())
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path_arr = url.path.strip("/").split("/")
+        if path_arr == ["jobs"]:
+            return self.send_json(200, [
+                {key: value for key, value in job.to_dict().items()
+                 if key not in ["incumbents", "result"]}
+                for job in self.service.get_job_arr()
+            ])
+        if len(path_arr) == 2 and path_arr[0] == "jobs":
+            job = self.get_path_job(path_arr)
+            if job is not None:
+                since = int(parse_qs(url.query).get("since", [0])[0])
+                self.send_json(200, job.to_dict(incumbent_start=since))
+            return
+        if len(path_arr) == 3 and path_arr[0] == "jobs" and path_arr[2] == "stream":
+            job = self.get_path_job(path_arr)
+            if job is not None:
+                self.stream_job(job)
+            return
+        self.send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_DELETE(self):
+        path_arr = urlparse(self.path).path.strip("/").split("/")
+        if len(path_arr) != 2 or path_arr[0] != "jobs":
+            return self.send_json(404, {"error": f"Unknown path: {self.path}"})
+        job = self.get_path_job(path_arr)
+        if job is not None:
+            self.service.cancel(job.job_id)
+            self.send_json(200, job.to_dict())
+
+    def stream_job(self, job: ScheduleJob) -> None:
+        """
+        Write every incumbent of the job as a json line as soon as it is
+        found, then the finished job as the last line.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        num_sent = 0
+        while True:
+            with job.condition:
+                while len(job.get_incumbents(num_sent)) == 0 and \
+                        job.status not in FINISHED_STATUSES:
+                    job.condition.wait()
+                incumbent_arr = job.get_incumbents(num_sent)
+                is_finished = job.status in FINISHED_STATUSES
+            for incumbent in incumbent_arr:
+                self.wfile.write((json.dumps(incumbent, default=json_default) + "\n").encode())
+            self.wfile.flush()
+            num_sent += len(incumbent_arr)
+            if is_finished and len(incumbent_arr) == 0:
+                break
+        self.wfile.write((json.dumps(job.to_dict(num_sent), default=json_default) + "\n").encode())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="scheduling service flags")
+    parser.add_argument(
+        "--host", type=str, default="127.0.0.1", help="address the service listens on"
+    )
+    parser.add_argument(
+        "--port", type=int, default=8765, help="port the service listens on"
+    )
+    parser.add_argument(
+        "--defaults", type=str, default=None,
+        help="json file of the default main.py flags of every job"
+    )
+    parser.add_argument(
+        "--max_parallel_jobs", type=int, default=2,
+        help="max number of jobs run at the same time, the others are queued"
+    )
+    parser.add_argument(
+        "--max_job_time", type=float, default=300,
+        help="max solve time in seconds of any job, caps the job time budgets"
+    )
+    parser.add_argument(
+        "--max_cached_inputs", type=int, default=8,
+        help="max number of parsed inputs kept in memory"
+    )
+
+    args = parser.parse_args()
+    default_arg_dict = json.load(open(args.defaults)) if args.defaults is not None else {}
+    ScheduleRequestHandler.service = ScheduleService(
+        default_arg_dict, max_parallel_jobs=args.max_parallel_jobs,
+        max_job_time=args.max_job_time, max_cached_inputs=args.max_cached_inputs
+    )
+    server = ThreadingHTTPServer((args.host, args.port), ScheduleRequestHandler)
+    print(f"Scheduling service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        ScheduleRequestHandler.service.shutdown()
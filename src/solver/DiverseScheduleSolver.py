@@ -0,0 +1,71 @@
+import os
+import numpy as np
+from ortools.sat.python import cp_model
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.utils import get_solution_tensor
+from solver.utils import get_cp_solver, get_solver_stats
+
+
+class DiverseScheduleSolver():
+    """
+    Find up to num_solutions good schedules that pairwise differ in at
+    least min_distance assignments (Hamming distance over the shift
+    variables). The model is built once; every round adds a diversity
+    constraint against the schedule of the previous round (so they add up
+    to all earlier schedules), hints the previous schedule in place of the
+    hints of the model and re-solves with solver_param_dict. Stops early
+    when a round finds no schedule.
+    """
+    def __init__(self, model: cp_model.CpModel, shift_vars: dict,
+                 solution_shape: tuple, solver_param_dict: dict=None,
+                 num_solutions: int=3, min_distance: int=10):
+        assert num_solutions > 0, "Number of solutions must be positive"
+        assert min_distance > 0, "Min distance must be positive"
+        self.model = model
+        self.shift_vars = shift_vars
+        self.solution_shape = solution_shape
+        self.solver_param_dict = solver_param_dict if solver_param_dict is not None else {}
+        self.num_solutions = num_solutions
+        self.min_distance = min_distance
+        self.status_list = []
+        self.solver_stats_list = []
+
+    def add_diversity_constraint(self, solution_mat) -> None:
+        """
+        Require at least min_distance shift variables to differ from the
+        (person x day x shift) solution matrix.
+        """
+        diff_arr = []
+        for (p, d, s), shift_var in self.shift_vars.items():
+            if isinstance(shift_var, int):
+                continue
+            diff_arr.append(1 - shift_var if solution_mat[p, d, s] else shift_var)
+        self.model.Add(sum(diff_arr) >= self.min_distance)
+
+    def add_hint(self, solution_mat) -> None:
+        self.model.ClearHints()
+        for (p, d, s), shift_var in self.shift_vars.items():
+            if not isinstance(shift_var, int):
+                self.model.AddHint(shift_var, int(solution_mat[p, d, s]))
+
+    def solve(self) -> list:
+        """
+        Return the (person x day x shift) solution matrices in the order
+        they are found.
+        """
+        solution_arr = []
+        self.status_list = []
+        self.solver_stats_list = []
+        for k in range(self.num_solutions):
+            if k > 0:
+                self.add_diversity_constraint(solution_arr[-1])
+                self.add_hint(solution_arr[-1])
+            solver = get_cp_solver(self.solver_param_dict)
+            status = solver.Solve(self.model)
+            self.status_list.append(solver.StatusName(status))
+            print(f" - Schedule {k + 1}: {solver.StatusName(status)}")
+            if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+                break
+            self.solver_stats_list.append(get_solver_stats(solver))
+            solution_arr.append(get_solution_tensor(solver, self.shift_vars, self.solution_shape))
+        return solution_arr
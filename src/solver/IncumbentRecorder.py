@@ -0,0 +1,40 @@
+import os, threading
+from ortools.sat.python import cp_model
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.utils import get_shift_var_arr, get_incumbent_tensor
+
+
+class IncumbentRecorder(cp_model.CpSolverSolutionCallback):
+    """
+    Solution callback that records the objective, best bound and solve time
+    of every improving incumbent and keeps the latest solution matrix.
+    Readers of incumbent_arr in other threads wait on condition, which is
+    notified on every incumbent. The search is stopped at the next
+    incumbent once stop_event is set.
+    """
+    def __init__(self, shift_vars: dict, solution_shape: tuple,
+                 condition: threading.Condition=None, stop_event: threading.Event=None):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.shift_vars = shift_vars
+        self.solution_shape = solution_shape
+        self.cell_idx_arr, self.var_arr = get_shift_var_arr(shift_vars, solution_shape)
+        self.condition = condition if condition is not None else threading.Condition()
+        self.incumbent_arr = []
+        self.solution_mat = None
+        self.stop_event = stop_event
+
+    def on_solution_callback(self):
+        solution_mat = get_incumbent_tensor(
+            self, self.cell_idx_arr, self.var_arr, self.solution_shape
+        )
+        with self.condition:
+            self.solution_mat = solution_mat
+            self.incumbent_arr.append({
+                "solution": len(self.incumbent_arr),
+                "objective": self.ObjectiveValue(),
+                "best_bound": self.BestObjectiveBound(),
+                "wall_time": self.WallTime(),
+            })
+            self.condition.notify_all()
+        if self.stop_event is not None and self.stop_event.is_set():
+            self.StopSearch()
@@ -0,0 +1,181 @@
+import os
+import numpy as np
+import pandas as pd
+from ortools.sat.python import cp_model
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.utils import Calendar, get_solution_tensor
+from solver.ScheduleModeler import ScheduleModeler
+from solver.utils import get_cp_solver, get_solver_stats
+
+
+class RollingHorizonSolver():
+    """
+    Solve a long schedule as overlapping windows of days. Each window is
+    modeled by ScheduleModeler with the boundary state of the days committed
+    before it (consecutive worked days and cumulative shift counts), and only
+    its first (window_days - overlap_days) days are committed. The windows
+    before the last one keep the cumulative shift counts within fairness_slack
+    of the pro-rated fairness bounds and within reach of the fairness bounds
+    of the whole schedule, which the last window applies. A trailing window
+    shorter than window_days is merged into the one before it. An infeasible
+    window is solved again with the fairness slack increased by 1, up to
+    max_retries times. The max_time_in_seconds of solver_param_dict is split
+    evenly over the windows.
+    """
+    def __init__(self, shift_mat_df: pd.DataFrame, staff_list: list,
+                 date_format: str, pref_tensor: np.ndarray=None,
+                 max_consecutive_dict: dict=None, calendar: Calendar=None,
+                 window_days: int=28, overlap_days: int=7,
+                 fairness_slack: int=1, max_retries: int=2,
+                 negative_pref_weight: int=5, solver_param_dict: dict=None,
+                 **modeler_kwargs):
+        assert 0 <= overlap_days < window_days, \
+            "Overlap days must be non-negative and less than window days"
+        self.shift_mat_df = shift_mat_df.reset_index(drop=True)
+        self.staff_list = staff_list
+        self.date_format = date_format
+        self.pref_tensor = pref_tensor
+        self.max_consecutive_dict = max_consecutive_dict
+        self.date_list = self.shift_mat_df['date'].tolist()
+        self.shift_list = self.shift_mat_df.columns.tolist()
+        self.shift_list.remove('date')
+        if calendar is None:
+            calendar = Calendar(self.date_list, self.date_format)
+        self.calendar = calendar
+        self.window_days = window_days
+        self.overlap_days = overlap_days
+        self.fairness_slack = fairness_slack
+        self.max_retries = max_retries
+        self.negative_pref_weight = negative_pref_weight
+        self.solver_param_dict = solver_param_dict if solver_param_dict is not None else {}
+        self.modeler_kwargs = modeler_kwargs
+        self.num_people = len(self.staff_list)
+        self.num_days = len(self.date_list)
+        self.num_shifts = len(self.shift_list)
+        self.status_list = []
+        self.solver_stats_list = []
+
+    def get_windows(self) -> list:
+        """
+        Return the (start, end, commit_end) day indices of every window. A
+        last window shorter than window_days is merged into the one before it.
+        """
+        window_arr = []
+        start = 0
+        while True:
+            end = start + self.window_days
+            if self.num_days - (end - self.overlap_days) < self.window_days:
+                window_arr.append((start, self.num_days, self.num_days))
+                return window_arr
+            window_arr.append((start, end, end - self.overlap_days))
+            start = end - self.overlap_days
+
+    def get_prev_count_arr(self, solution_mat, start) -> np.ndarray:
+        """
+        Return the (person x shift x [Weekend, Weekday]) shift counts of the
+        days before start.
+        """
+        weekend_mask = self.calendar.friday_saturday_mask[:start]
+        return np.stack([
+            solution_mat[:, :start][:, weekend_mask].sum(axis=1),
+            solution_mat[:, :start][:, ~weekend_mask].sum(axis=1),
+        ], axis=-1)
+
+    def get_next_count_arr(self, end) -> np.ndarray:
+        """
+        Return the (shift x [Weekend, Weekday]) shift counts of the days from
+        end on.
+        """
+        shift_mat = self.shift_mat_df[self.shift_list].to_numpy()[end:]
+        weekend_mask = self.calendar.friday_saturday_mask[end:]
+        return np.stack([
+            shift_mat[weekend_mask].sum(axis=0), shift_mat[~weekend_mask].sum(axis=0)
+        ], axis=-1)
+
+    def solve_window(self, solution_mat, start, end, fairness_slack, param_dict) -> tuple:
+        """
+        Model and solve the days [start, end) after the committed days of
+        solution_mat, return the solver, the shift variables and the status.
+        """
+        modeler = ScheduleModeler(
+            shift_mat_df=self.shift_mat_df.iloc[start:end].reset_index(drop=True),
+            staff_list=self.staff_list, date_format=self.date_format,
+            pref_tensor=None if self.pref_tensor is None else self.pref_tensor[:, start:end],
+            max_consecutive_dict=self.max_consecutive_dict,
+            calendar=Calendar(self.date_list[start:end], self.date_format),
+            prev_work_mat=solution_mat[:, :start].any(axis=2),
+            prev_count_arr=self.get_prev_count_arr(solution_mat, start),
+            next_count_arr=self.get_next_count_arr(end) if end < self.num_days else None,
+            fairness_slack=fairness_slack, negative_pref_weight=self.negative_pref_weight,
+            verbose=False, **self.modeler_kwargs
+        )
+        model, shifts = modeler.get_model()
+        solver = get_cp_solver(param_dict)
+        status = solver.Solve(model)
+        return solver, shifts, status
+
+    def solve(self) -> np.ndarray:
+        """
+        Solve every window in order and return the stitched
+        (person x day x shift) solution matrix.
+        """
+        solution_mat = np.zeros((self.num_people, self.num_days, self.num_shifts), dtype=np.int8)
+        window_arr = self.get_windows()
+        self.status_list = []
+        self.solver_stats_list = []
+        param_dict = dict(self.solver_param_dict)
+        if "max_time_in_seconds" in param_dict:
+            param_dict["max_time_in_seconds"] /= len(window_arr)
+        for start, end, commit_end in window_arr:
+            window_name = f"{self.date_list[start]} - {self.date_list[end-1]}"
+            fairness_slack = 0 if end == self.num_days else self.fairness_slack
+            for retry in range(self.max_retries + 1):
+                solver, shifts, status = self.solve_window(
+                    solution_mat, start, end, fairness_slack + retry, param_dict
+                )
+                print(f" - Window {window_name} (fairness slack={fairness_slack + retry}): "
+                      f"{solver.StatusName(status)}")
+                if status != cp_model.INFEASIBLE:
+                    break
+            self.status_list.append(solver.StatusName(status))
+            self.solver_stats_list.append(get_solver_stats(solver))
+            if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+                raise RuntimeError(
+                    f"Window {window_name} is {solver.StatusName(status)} with fairness slack "
+                    f"{fairness_slack + retry}, try larger --window_days or --max_solve_time"
+                )
+            window_solution_mat = get_solution_tensor(
+                solver, shifts, (self.num_people, end - start, self.num_shifts)
+            )
+            solution_mat[:, start:commit_end] = window_solution_mat[:, :commit_end - start]
+        return solution_mat
+
+    def get_status_name(self) -> str:
+        """
+        Return the status of the last solve: FEASIBLE if every window is
+        solved (the stitched schedule is not proven optimal), else the status
+        of the first unsolved window.
+        """
+        for status_name in self.status_list:
+            if status_name not in ["OPTIMAL", "FEASIBLE"]:
+                return status_name
+        return "FEASIBLE" if len(self.status_list) > 0 else "UNKNOWN"
+
+    def get_solver_stats(self, solution_mat) -> dict:
+        """
+        Return the search stats (see solver.utils.get_solver_stats) of the
+        last solve summed over the windows, with the objective of the
+        stitched solution_mat. There is no best bound of the whole schedule.
+        """
+        solver_stats = {"status": self.get_status_name(), "num_windows": len(self.status_list)}
+        for key in ["num_conflicts", "num_branches", "wall_time"]:
+            solver_stats[key] = sum(window_stats[key] for window_stats in self.solver_stats_list)
+        solver_stats["objective"] = None
+        solver_stats["best_bound"] = None
+        if self.pref_tensor is not None:
+            pref_tensor = self.pref_tensor.astype(np.int64)
+            weight_tensor = np.where(
+                pref_tensor < 0, pref_tensor * self.negative_pref_weight, pref_tensor
+            )
+            solver_stats["objective"] = float((weight_tensor * solution_mat).sum())
+        return solver_stats
@@ -24,6 +24,9 @@ from datetime import datetime
 import pandas as pd
 import numpy as np
 import os, json
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.table_readers import read_table
+from data_process.utils import Calendar, get_unavailable_mask
 
 
 class ScheduleInputProcessor:
@@ -37,12 +40,8 @@ class ScheduleInputProcessor:
         self.day_of_week = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
         assert os.path.isfile(shift_requirement_url)
         assert os.path.isfile(staff_requirement_url)
-        self.shift_req_df = pd.read_excel(
-            self.shift_requirement_url, converters={'names':str,'ages':str}
-        )
-        self.staff_req_df = pd.read_excel(
-            self.staff_requirement_url, converters={'names':str,'ages':str}
-        )
+        self.shift_req_df = read_table(self.shift_requirement_url)
+        self.staff_req_df = read_table(self.staff_requirement_url)
         self.staff_req_df = self.stringfy_column_dates(self.staff_req_df)
         for date in exclude_dates:
             if date in self.staff_req_df.columns:
@@ -61,29 +60,15 @@ class ScheduleInputProcessor:
             col if type(col) == str else col.strftime(self.date_format) 
             for col in self.staff_req_df.columns
         ])
-        self.additional_staff_req_arr = [{} for _ in range(len(self.get_staff_arr()))]
+        # (staff x day x shift) mask of the shifts excluded by the additional
+        # staff requirements, compiled like the unavailable days json
+        self.additional_staff_req_dict = {}
         if os.path.isfile(additional_staff_requirement_url):
             self.additional_staff_req_dict = json.load(open(additional_staff_requirement_url))
-            staff_names = list(self.additional_staff_req_dict.keys())
-            for staff_name in staff_names:
-                assert staff_name in self.get_staff_arr()
-                staff_idx = self.get_staff_arr().index(staff_name)
-                curr_additional_staff_dict = self.additional_staff_req_dict[staff_name]
-                for date in curr_additional_staff_dict.keys():
-                    assert date in self.day_of_week or \
-                        (self.validate_date_str(date) and date in self.all_date_arr)
-                    assert all([shift in self.get_shift_arr() 
-                                for shift in curr_additional_staff_dict[date]])
-                    shift_idx_arr = [self.get_shift_arr().index(shift) 
-                                     for shift in curr_additional_staff_dict[date]]
-                    if date in self.day_of_week:
-                        for idx, date_str in enumerate(self.all_date_arr):
-                            weekday_idx = datetime.strptime(date_str, self.date_format).weekday()
-                            if self.day_of_week[weekday_idx] == date:
-                                self.additional_staff_req_arr[staff_idx][idx]=shift_idx_arr
-                    else:
-                        idx = self.all_date_arr.index(date)
-                        self.additional_staff_req_arr[staff_idx][idx]=shift_idx_arr
+        self.additional_staff_req_mask = get_unavailable_mask(
+            self.additional_staff_req_dict, self.get_staff_arr(), self.get_shift_arr(),
+            Calendar(self.all_date_arr, self.date_format), strict=True
+        )
     def stringfy_column_dates(self, df):
         col_rename_dic = {}
         for col_name in df.columns:
@@ -127,32 +112,45 @@ class ScheduleInputProcessor:
         matrix = df.loc[:, df.columns != 'people'].to_numpy()
         return row_entries, col_entries, matrix
 
+    def get_req_column_idx_arr(self, dates, req_dates) -> np.ndarray:
+        """
+        Return the staff requirement column index of every day: the date
+        column for holidays and weekends, the day of week column otherwise.
+        """
+        req_column_idx_dict = {column: idx for idx, column in enumerate(req_dates)}
+        date_column_set = set(self.holidays) | set(self.weekend_arr)
+        column_arr = [
+            date_str if date_str in date_column_set else
+            self.day_of_week[datetime.strptime(date_str, self.date_format).weekday()]
+            for date_str in dates
+        ]
+        column_idx_arr = np.array(
+            [req_column_idx_dict.get(column, -1) for column in column_arr], dtype=int
+        )
+        missing_idx_arr = np.nonzero(column_idx_arr == -1)[0]
+        if len(missing_idx_arr) > 0:
+            raise ValueError(
+                f"No staff requirement column in {self.staff_requirement_url} for: " +
+                ", ".join(f"{dates[d]} ({column_arr[d]})" for d in missing_idx_arr)
+            )
+        return column_idx_arr
+
     def get_preference_matrix(self):
+        """
+        Return the (staff x day x shift) preference matrix. Non-existing
+        shifts and the additional staff requirements are -2.
+        """
         dates, shifts, shift_mat = self.load_day_requirements()
         people, req_dates, req_mat = self.load_staff_requirements()
-        pref_mat = np.zeros((self.get_num_staffs(), self.get_num_days(), self.get_max_shifts()))
-        for people_idx in range(self.get_num_staffs()):
-            pref_setting = req_mat[people_idx]
-            additional_pref_setting = self.additional_staff_req_arr[people_idx]
-            for date_idx in range(self.get_num_days()):
-                for shift_idx in range(self.get_max_shifts()):
-                    if (not shift_mat[date_idx, shift_idx]) or \
-                        (date_idx in additional_pref_setting.keys() and 
-                            shift_idx in additional_pref_setting[date_idx]):
-                        # set to -2 when no shift exist
-                        pref_mat[people_idx, date_idx, shift_idx] = -2
-                    else:
-                        # set staff preference
-                        date_str = dates[date_idx]
-                        if date_str in self.holidays or date_str in self.weekend_arr:
-                            try:
-                                pref_mat_idx = req_dates.index(date_str)
-                            except:
-                                breakpoint()
-                        else:
-                            pref_mat_idx = req_dates.index(self.get_weekday_str(date_str))
-                        assert pref_mat_idx > -1
-                        pref_mat[people_idx, date_idx, shift_idx] = pref_setting[pref_mat_idx]
+        column_idx_arr = self.get_req_column_idx_arr(dates, req_dates)
+        no_shift_mask = np.zeros(
+            (self.get_num_staffs(), self.get_num_days(), self.get_max_shifts()), dtype=bool
+        )
+        no_shift_mask[:] = ~shift_mat.astype(bool)
+        no_shift_mask |= self.additional_staff_req_mask
+        day_pref_mat = req_mat[:, column_idx_arr].astype(float)
+        pref_mat = np.repeat(day_pref_mat[:, :, None], self.get_max_shifts(), axis=2)
+        pref_mat[no_shift_mask] = -2
         return pref_mat
 
     def get_start_date(self):
@@ -204,10 +202,7 @@ class ScheduleInputProcessor:
             .columns.tolist()
 
     def get_additional_staff_requirement(self):
-        try:
-            return self.additional_staff_req_dict
-        except AttributeError:
-            return {}
+        return self.additional_staff_req_dict
 
     def validate_date_str(self, date_text):
         try:
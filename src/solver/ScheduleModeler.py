@@ -3,24 +3,64 @@ import numpy as np
 import pandas as pd
 from ortools.sat.python import cp_model
 os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from data_process.utils import is_friday_saturday
+from data_process.utils import Calendar, as_pref_tensor
 
 class ScheduleModeler():
     def __init__(self, shift_mat_df: pd.DataFrame, staff_list: list, 
-                 date_format: str, pref_mat_dict: dict=None, 
-                 max_consecutive_dict: dict=None):
+                 date_format: str, pref_tensor: np.ndarray=None, 
+                 max_consecutive_dict: dict=None, calendar: Calendar=None,
+                 sparse: bool=False, max_consecutive_encoding: str="window",
+                 prev_work_mat: np.ndarray=None, prev_count_arr: np.ndarray=None,
+                 next_count_arr: np.ndarray=None, fairness_slack: int=0,
+                 negative_pref_weight: int=5,
+                 verbose: bool=True):
         self.shift_mat_df = shift_mat_df
         self.shift_mat = shift_mat_df.loc[:, shift_mat_df.columns!="date"].to_numpy()
-        self.pref_mat_dict = pref_mat_dict
+        # (person x day x shift) int8 preferences, ordered as staff_list
+        self.pref_tensor = None if pref_tensor is None else as_pref_tensor(pref_tensor)
         self.max_consecutive_dict = max_consecutive_dict
         self.date_list = self.shift_mat_df['date'].tolist()
         self.shift_list = self.shift_mat_df.columns.tolist()
         self.shift_list.remove('date')
         self.staff_list = staff_list
         self.date_format = date_format
+        if calendar is None:
+            calendar = Calendar(self.date_list, self.date_format)
+        self.calendar = calendar
         self.num_people = len(self.staff_list)
         self.num_days = len(self.date_list)
         self.num_shifts = len(self.shift_list)
+        self.sparse = sparse
+        assert max_consecutive_encoding in ["window", "prefix", "automaton"], \
+            f"Invalid max consecutive encoding: {max_consecutive_encoding}"
+        self.max_consecutive_encoding = max_consecutive_encoding
+        # boundary state of the days scheduled before the first date:
+        # prev_work_mat (person x previous day) worked days and
+        # prev_count_arr (person x shift x [Weekend, Weekday]) shift counts
+        self.prev_work_mat = prev_work_mat
+        self.prev_count_arr = prev_count_arr
+        # (shift x [Weekend, Weekday]) shift counts of the days scheduled after
+        # the last date, the shift counts then never exceed the max of the
+        # whole schedule
+        self.next_count_arr = next_count_arr
+        # shifts per person may be this many below the min or above the max
+        self.fairness_slack = fairness_slack
+        # objective weight of the negative preferences relative to the positive ones
+        self.negative_pref_weight = negative_pref_weight
+        self.verbose = verbose
+
+    def get_var_mask(self) -> np.ndarray:
+        """
+        Return the (person x day x shift) mask of the cells that get a model
+        variable. In sparse mode, non-existing shifts and unavailable (-3)
+        preferences are pruned, and their shifts lookup is a constant 0.
+        """
+        var_mask = np.ones((self.num_people, self.num_days, self.num_shifts), dtype=bool)
+        if self.sparse:
+            var_mask &= self.shift_mat.astype(bool)
+            if self.pref_tensor is not None:
+                var_mask &= self.pref_tensor != -3
+        return var_mask
 
     def get_model(self):
         peop_range = range(self.num_people)
@@ -30,25 +70,38 @@ class ScheduleModeler():
         model = cp_model.CpModel()
         shifts = {}
         total_shifts_arr = [{"Weekend": 0, "Weekday": 0} for _ in shift_range]
+        var_mask = self.get_var_mask()
         # create variables
         for p in peop_range:
             for d in day_range:
                 for s in shift_range:
-                    shifts[(p, d, s)] = model.NewBoolVar("shift_p{}d{}s{}".format(p, d, s))
+                    if var_mask[p, d, s]:
+                        shifts[(p, d, s)] = model.NewBoolVar("shift_p{}d{}s{}".format(p, d, s))
+                    else:
+                        shifts[(p, d, s)] = 0
                     if p == 0 and self.shift_mat[d][s]:
                         total_shifts += 1
-                        if is_friday_saturday(self.date_list[d]):
+                        if self.calendar.friday_saturday_mask[d]:
                             total_shifts_arr[s]["Weekend"] += 1
                         else:
                             total_shifts_arr[s]["Weekday"] += 1
+        if self.prev_count_arr is not None:
+            total_shifts += int(self.prev_count_arr.sum())
+            for s in shift_range:
+                for k, key in enumerate(["Weekend", "Weekday"]):
+                    total_shifts_arr[s][key] += int(self.prev_count_arr[:, s, k].sum())
 
         # Each existing shift has 1 staff.
         # Each non-existing shift has 0 staff.
         for d in day_range:
             for s in shift_range:
                 if self.shift_mat[d][s] == 0:
-                    model.Add(sum(shifts[(p, d, s)] for p in peop_range) == 0)
+                    if not self.sparse:
+                        model.Add(sum(shifts[(p, d, s)] for p in peop_range) == 0)
                 else:
+                    if not var_mask[:, d, s].any():
+                        raise ValueError("No available staff for {} {}"
+                            .format(self.date_list[d], self.shift_list[s]))
                     model.Add(sum(shifts[(p, d, s)] for p in peop_range) == 1)
 
         # Each staff can't take primary or secondary on the same day.
@@ -61,80 +114,223 @@ class ScheduleModeler():
                 # model.AddBoolXOr([shifts[(p, d, 0)], shifts[(p, d, 1)]])
         
         # Evenly distribute all shifts
-        print("Shifts distributing statistics:")
+        log = print if self.verbose else lambda *args: None
+        log("Shifts distributing statistics:")
         min_max_shifts_arr = [{key: [] for key in total_shifts_arr[0]} for _ in shift_range]
         for s in shift_range:
             for key in total_shifts_arr[s]:
                 curr_total_shifts = total_shifts_arr[s][key]
-                print(" - Total {} {} Shift: {}".format(key, self.shift_list[s], curr_total_shifts))
+                log(" - Total {} {} Shift: {}".format(key, self.shift_list[s], curr_total_shifts))
                 curr_min_shifts_per_person = curr_total_shifts // self.num_people
                 if curr_total_shifts % self.num_people == 0:
                     curr_max_shifts_per_person = curr_min_shifts_per_person
                 else:
                     curr_max_shifts_per_person = curr_min_shifts_per_person + 1
                 min_max_shifts_arr[s][key] = [curr_min_shifts_per_person, curr_max_shifts_per_person]
-                print(" - Min {} {} shift Per Person: {}"
+                log(" - Min {} {} shift Per Person: {}"
                     .format(key, self.shift_list[s], curr_min_shifts_per_person))
-                print(" - Max {} {} shift Per Person: {}"
+                log(" - Max {} {} shift Per Person: {}"
                     .format(key, self.shift_list[s], curr_max_shifts_per_person))
-                print()
-        print(" - Total Shifts: {}".format(total_shifts))
+                log()
+        log(" - Total Shifts: {}".format(total_shifts))
         min_total_shifts = total_shifts // self.num_people
         if total_shifts % self.num_people == 0:
             max_total_shifts = min_total_shifts
         else:
             max_total_shifts = min_total_shifts + 1
-        print(" - Min Shift Per Person: {}".format(min_total_shifts))
-        print(" - Max Shift Per Person: {}".format(max_total_shifts))
-        print()
+        log(" - Min Shift Per Person: {}".format(min_total_shifts))
+        log(" - Max Shift Per Person: {}".format(max_total_shifts))
+        log()
+
+        # min-max shift numbers of the whole schedule, including the shifts
+        # after the last date, the last item is of the total shift number
+        if self.next_count_arr is not None:
+            schedule_min_max_arr, quota_deficit_arr = [], []
+            for s in shift_range:
+                schedule_min_max_arr.append({})
+                quota_deficit_arr.append({})
+                for k, key in enumerate(["Weekend", "Weekday"]):
+                    schedule_shifts = total_shifts_arr[s][key] + int(self.next_count_arr[s, k])
+                    schedule_min_max_arr[s][key] = [
+                        schedule_shifts // self.num_people, -(-schedule_shifts // self.num_people)
+                    ]
+                    quota_deficit_arr[s][key] = []
+            schedule_shifts = total_shifts + int(self.next_count_arr.sum())
+            schedule_min_max_arr.append([
+                schedule_shifts // self.num_people, -(-schedule_shifts // self.num_people)
+            ])
+            quota_deficit_arr.append([])
 
         # applying min-max shift number constraints
         for p in peop_range:
             shifts_worked_arr = [{key: 0 for key in min_max_shifts_arr[0]} for _ in shift_range]
             total_shifts_worked = 0
+            if self.prev_count_arr is not None:
+                total_shifts_worked += int(self.prev_count_arr[p].sum())
+                for s in shift_range:
+                    for k, key in enumerate(["Weekend", "Weekday"]):
+                        shifts_worked_arr[s][key] += int(self.prev_count_arr[p, s, k])
             for d in day_range:
                 for s in shift_range:
                     if self.shift_mat[d][s]:
                         total_shifts_worked += shifts[(p, d, s)]
-                        if is_friday_saturday(self.date_list[d]):
+                        if self.calendar.friday_saturday_mask[d]:
                             shifts_worked_arr[s]["Weekend"] += shifts[(p, d, s)]
                         else:
                             shifts_worked_arr[s]["Weekday"] += shifts[(p, d, s)]
             # apply min-max constraints for different types of shifts
             for s in shift_range:
                 for key in min_max_shifts_arr[s]:
-                    min_shifts_per_person = min_max_shifts_arr[s][key][0]
-                    max_shifts_per_person = min_max_shifts_arr[s][key][1]
+                    min_shifts_per_person = max(min_max_shifts_arr[s][key][0] - self.fairness_slack, 0)
+                    max_shifts_per_person = min_max_shifts_arr[s][key][1] + self.fairness_slack
                     model.Add(shifts_worked_arr[s][key] >= min_shifts_per_person)
                     model.Add(shifts_worked_arr[s][key] <= max_shifts_per_person)
             # apply min-max constraints total shift number
-            model.Add(min_total_shifts <= total_shifts_worked)
-            model.Add(total_shifts_worked <= max_total_shifts)
+            model.Add(max(min_total_shifts - self.fairness_slack, 0) <= total_shifts_worked)
+            model.Add(total_shifts_worked <= max_total_shifts + self.fairness_slack)
+            # stay within the min-max of the whole schedule
+            if self.next_count_arr is not None:
+                person_deficit_arr = []
+                for s in shift_range:
+                    for key in min_max_shifts_arr[s]:
+                        quota_deficit = self.add_schedule_quota(
+                            model, shifts_worked_arr[s][key], schedule_min_max_arr[s][key]
+                        )
+                        quota_deficit_arr[s][key].append(quota_deficit)
+                        person_deficit_arr.append(quota_deficit)
+                quota_deficit_arr[-1].append(self.add_schedule_quota(
+                    model, total_shifts_worked, schedule_min_max_arr[-1]
+                ))
+                # the shifts missing to the min of every type fit in the max total
+                model.Add(total_shifts_worked + sum(person_deficit_arr) <= schedule_min_max_arr[-1][1])
+        # the shifts after the last date cover what is missing to the min
+        if self.next_count_arr is not None:
+            for s in shift_range:
+                for k, key in enumerate(["Weekend", "Weekday"]):
+                    model.Add(sum(quota_deficit_arr[s][key]) <= int(self.next_count_arr[s, k]))
+            model.Add(sum(quota_deficit_arr[-1]) <= int(self.next_count_arr.sum()))
         
         # accomondate request
-        if self.pref_mat_dict is not None:
-            bool_array = []
-            for p in peop_range:
-                curr_pref_mat = self.pref_mat_dict[self.staff_list[p]]
-                for d in day_range:
-                    for s in shift_range:
-                        if curr_pref_mat[d][s] < 0:
-                            bool_array.append(int(curr_pref_mat[d][s]) * shifts[(p, d, s)]*5)
-                        else:
-                            bool_array.append(int(curr_pref_mat[d][s]) * shifts[(p, d, s)])
-            model.Maximize(sum(bool_array))
+        if self.pref_tensor is not None:
+            pref_tensor = self.pref_tensor.astype(np.int64)
+            weight_tensor = np.where(
+                pref_tensor < 0, pref_tensor * self.negative_pref_weight, pref_tensor
+            )
+            var_idx_arr = np.argwhere(var_mask & (weight_tensor != 0))
+            model.Maximize(cp_model.LinearExpr.WeightedSum(
+                [shifts[(p, d, s)] for p, d, s in var_idx_arr.tolist()],
+                weight_tensor[var_mask & (weight_tensor != 0)].tolist()
+            ))
 
         if self.max_consecutive_dict is not None:
-            for p in peop_range:
-                staff = self.staff_list[p]
-                max_cons_shifts = self.max_consecutive_dict[staff]
-                for d in range(self.num_days - max_cons_shifts):
-                    shift_arr = []
-                    for i in range(max_cons_shifts+1):
-                        for s in shift_range:
-                            curr_shift = shifts[(p, d + i, s)]
-                            shift_arr.append(curr_shift)
-                    model.Add(sum(shift_arr) <= max_cons_shifts)
+            if self.max_consecutive_encoding == "window":
+                self.add_window_max_consecutive(model, shifts)
+            else:
+                work_vars = self.get_work_vars(model, shifts)
+                if self.max_consecutive_encoding == "prefix":
+                    self.add_prefix_max_consecutive(model, work_vars)
+                else:
+                    self.add_automaton_max_consecutive(model, work_vars)
+            if self.prev_work_mat is not None:
+                self.add_boundary_max_consecutive(model, shifts)
 
         return model, shifts
 
+    def add_schedule_quota(self, model, shifts_worked, schedule_min_max):
+        """
+        Cap shifts_worked at the max of the whole schedule and return its
+        deficit to the min of the whole schedule.
+        """
+        model.Add(shifts_worked <= schedule_min_max[1])
+        quota_deficit = model.NewIntVar(0, schedule_min_max[0], "")
+        model.Add(quota_deficit >= schedule_min_max[0] - shifts_worked)
+        return quota_deficit
+
+    def add_solution_hint(self, model, shifts, hint_mat) -> None:
+        """
+        Hint every shift variable with its value in the (person x day x shift)
+        hint matrix.
+        """
+        for (p, d, s), shift_var in shifts.items():
+            if not isinstance(shift_var, int):
+                model.AddHint(shift_var, int(hint_mat[p, d, s]))
+
+    def add_window_max_consecutive(self, model, shifts):
+        """
+        One constraint over all shifts of every (max consecutive + 1) days window.
+        """
+        for p in range(self.num_people):
+            staff = self.staff_list[p]
+            max_cons_shifts = self.max_consecutive_dict[staff]
+            for d in range(self.num_days - max_cons_shifts):
+                shift_arr = []
+                for i in range(max_cons_shifts+1):
+                    for s in range(self.num_shifts):
+                        curr_shift = shifts[(p, d + i, s)]
+                        shift_arr.append(curr_shift)
+                model.Add(sum(shift_arr) <= max_cons_shifts)
+
+    def add_boundary_max_consecutive(self, model, shifts):
+        """
+        Bound the windows that start in the previously scheduled days
+        (prev_work_mat) and end in the current days.
+        """
+        for p in range(self.num_people):
+            staff = self.staff_list[p]
+            max_cons_shifts = int(self.max_consecutive_dict[staff])
+            prev_work_arr = self.prev_work_mat[p]
+            for j in range(1, min(max_cons_shifts, len(prev_work_arr)) + 1):
+                num_prev_worked = int(np.sum(prev_work_arr[-j:]))
+                if num_prev_worked == 0:
+                    continue
+                model.Add(num_prev_worked + sum(
+                    shifts[(p, d, s)] for d in range(min(max_cons_shifts + 1 - j, self.num_days))
+                    for s in range(self.num_shifts)
+                ) <= max_cons_shifts)
+
+    def get_work_vars(self, model, shifts):
+        """
+        Return the per (person, day) "works that day" literals.
+        """
+        work_vars = {}
+        for p in range(self.num_people):
+            for d in range(self.num_days):
+                work_vars[(p, d)] = model.NewBoolVar("work_p{}d{}".format(p, d))
+                model.Add(work_vars[(p, d)] == sum(
+                    shifts[(p, d, s)] for s in range(self.num_shifts)
+                ))
+        return work_vars
+
+    def add_prefix_max_consecutive(self, model, work_vars):
+        """
+        Prefix sums of the worked days, every window is bounded by the
+        difference of two prefix sums.
+        """
+        for p in range(self.num_people):
+            staff = self.staff_list[p]
+            max_cons_shifts = self.max_consecutive_dict[staff]
+            prefix_arr = [0]
+            for d in range(self.num_days):
+                prefix = model.NewIntVar(0, d + 1, "prefix_p{}d{}".format(p, d))
+                model.Add(prefix == prefix_arr[-1] + work_vars[(p, d)])
+                prefix_arr.append(prefix)
+            for d in range(self.num_days - max_cons_shifts):
+                model.Add(prefix_arr[d + max_cons_shifts + 1] - prefix_arr[d] <= max_cons_shifts)
+
+    def add_automaton_max_consecutive(self, model, work_vars):
+        """
+        Automaton over the worked days whose state is the length of the
+        current run of worked days.
+        """
+        for p in range(self.num_people):
+            staff = self.staff_list[p]
+            max_cons_shifts = int(self.max_consecutive_dict[staff])
+            transition_arr = []
+            for state in range(max_cons_shifts + 1):
+                transition_arr.append((state, 0, 0))
+                if state < max_cons_shifts:
+                    transition_arr.append((state, 1, state + 1))
+            model.AddAutomaton(
+                [work_vars[(p, d)] for d in range(self.num_days)], 0,
+                list(range(max_cons_shifts + 1)), transition_arr
+            )
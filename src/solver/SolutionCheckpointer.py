@@ -0,0 +1,81 @@
+import os
+import numpy as np
+from ortools.sat.python import cp_model
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.utils import get_shift_var_arr, get_incumbent_tensor
+
+
+def save_checkpoint(checkpoint_url, solution_mat, objective, best_bound, elapsed_time):
+    """
+    Atomically save an incumbent solution to a .npz checkpoint, the previous
+    checkpoint is only replaced once the new one is fully written.
+    """
+    tmp_url = checkpoint_url + ".tmp"
+    with open(tmp_url, "wb") as f:
+        np.savez(
+            f, solution_mat=solution_mat, objective=objective,
+            best_bound=best_bound, elapsed_time=elapsed_time
+        )
+    os.replace(tmp_url, checkpoint_url)
+
+
+def load_checkpoint(checkpoint_url) -> dict:
+    """
+    Load a .npz checkpoint as a dict.
+    """
+    with np.load(checkpoint_url) as checkpoint:
+        return {
+            "solution_mat": checkpoint["solution_mat"],
+            "objective": float(checkpoint["objective"]),
+            "best_bound": float(checkpoint["best_bound"]),
+            "elapsed_time": float(checkpoint["elapsed_time"]),
+        }
+
+
+class SolutionCheckpointer(cp_model.CpSolverSolutionCallback):
+    """
+    Solution callback that checkpoints every improving incumbent (solution
+    matrix, objective, best bound and elapsed solve time) to disk. Call
+    save_final after the solve to record the time spent after the last
+    incumbent.
+    """
+    def __init__(self, shift_vars: dict, solution_shape: tuple,
+                 checkpoint_url: str, prev_elapsed_time: float=0.0):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.shift_vars = shift_vars
+        self.solution_shape = solution_shape
+        self.cell_idx_arr, self.var_arr = get_shift_var_arr(shift_vars, solution_shape)
+        self.checkpoint_url = checkpoint_url
+        self.prev_elapsed_time = prev_elapsed_time
+        self.num_solutions = 0
+        self.solution_mat = None
+        self.objective = None
+
+    def on_solution_callback(self):
+        solution_mat = get_incumbent_tensor(
+            self, self.cell_idx_arr, self.var_arr, self.solution_shape
+        )
+        self.num_solutions += 1
+        self.solution_mat = solution_mat
+        self.objective = self.ObjectiveValue()
+        save_checkpoint(
+            self.checkpoint_url, solution_mat, self.objective,
+            self.BestObjectiveBound(), self.prev_elapsed_time + self.WallTime()
+        )
+
+    def save_final(self, solver: cp_model.CpSolver):
+        """
+        Save the last incumbent (or the resumed checkpoint if the solve found
+        none) with the final best bound and the elapsed time of the whole
+        solve.
+        """
+        solution_mat, objective = self.solution_mat, self.objective
+        if solution_mat is None:
+            if not os.path.isfile(self.checkpoint_url):
+                return
+            checkpoint = load_checkpoint(self.checkpoint_url)
+            solution_mat, objective = checkpoint["solution_mat"], checkpoint["objective"]
+        save_checkpoint(
+            self.checkpoint_url, solution_mat, objective,
+            solver.BestObjectiveBound(), self.prev_elapsed_time + solver.WallTime()
+        )
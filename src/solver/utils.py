@@ -1,75 +1,93 @@
+import os, json
 import numpy as np
 import pandas as pd
-from datetime import datetime
+from google.protobuf import json_format
+from ortools.sat.python import cp_model
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.utils import Calendar, get_solution_tensor, as_pref_tensor
+from data_process.schedule_stats import get_schedule_stats_df, get_cant_assignments, \
+                                        print_schedule_stats, PREF_COUNT_KEYS
 
 def get_solution_matrix(solver, shifts, n_days, n_staffs, n_shifts):
-    solu_mat = np.zeros((n_staffs, n_days, n_shifts))
-    for p in range(n_staffs):
-        for d in range(n_days):
-            for s in range(n_shifts):
-                try:
-                    solu_mat[p, d, s] = solver.Value(shifts[p, d, s])
-                except:
-                    solu_mat[p, d, s] = 0
-    return solu_mat
+    return get_solution_tensor(solver, shifts, (n_staffs, n_days, n_shifts))
+
+
+def get_solver_parameters(args) -> dict:
+    """
+    Return the CP-SAT parameters of the --solver_config profile,
+    overridden by the solver flags.
+    """
+    param_dict = {}
+    if args.solver_config is not None:
+        param_dict.update(json.load(open(args.solver_config)))
+    flag_param_dict = {
+        "max_time_in_seconds": args.max_solve_time,
+        "num_search_workers": args.num_workers,
+        "random_seed": args.random_seed,
+        "randomize_search": args.randomize_search,
+        "linearization_level": args.linearization_level,
+        "search_branching": args.search_branching,
+        "log_search_progress": args.log_search_progress,
+        "repair_hint": args.repair_hint,
+    }
+    for key, value in flag_param_dict.items():
+        if value is not None:
+            param_dict[key] = value
+    return param_dict
+
+
+def get_cp_solver(param_dict) -> cp_model.CpSolver:
+    """
+    Return a CP-SAT solver set up with the given parameters.
+    """
+    solver = cp_model.CpSolver()
+    json_format.ParseDict(param_dict, solver.parameters)
+    return solver
+
+
+def get_solver_stats(solver) -> dict:
+    """
+    Return the search stats of a CP-SAT solver after Solve.
+    """
+    return {
+        "status": solver.StatusName(),
+        "num_conflicts": solver.NumConflicts(),
+        "num_branches": solver.NumBranches(),
+        "wall_time": solver.WallTime(),
+        "objective": solver.ObjectiveValue(),
+        "best_bound": solver.BestObjectiveBound(),
+    }
+
+
+def save_solver_parameters(param_dict, json_url) -> None:
+    """
+    Save the CP-SAT parameters of a solve to a json file.
+    """
+    with open(json_url, "w") as f:
+        json.dump(param_dict, f, indent=4)
 
 
 def print_staff_shedule_stats(
-    solution_mat, pref_mat_dict, staff_arr, date_arr, shift_arr, date_format
+    solution_mat, pref_tensor, staff_arr, date_arr, shift_arr, date_format
 ):
     assert solution_mat.shape[0] == len(staff_arr)
     assert solution_mat.shape[1] == len(date_arr)
     assert solution_mat.shape[2] == len(shift_arr)
 
-    want_count = 0
-    ok_count = 0
-    no_pref_count = 0
-    cant_count = 0
-    total_count = 0
-    staff_shift_arr = [[{"Weekend": 0, "Weekday": 0}for _ in range(len(shift_arr))] for _ in range(len(staff_arr))]
-    total_shift_arr = [0 for _ in range(len(staff_arr))]
-    for p in range(solution_mat.shape[0]):
-        staff = staff_arr[p]
-        for d in range(solution_mat.shape[1]):
-            for s in range(solution_mat.shape[2]):
-                if solution_mat[p, d, s] == 1:
-                    total_count += 1
-                    total_shift_arr[p] += 1
-                    week_of_day_idx = datetime.strptime(date_arr[d], date_format).weekday()
-                    shift_type = "Weekend" if week_of_day_idx==4 or week_of_day_idx==5 else "Weekday"
-                    staff_shift_arr[p][s][shift_type] += 1
-                    if pref_mat_dict[staff][d][s] > 1:
-                        want_count += 1
-                    elif pref_mat_dict[staff][d][s] == 1:
-                        ok_count += 1
-                    elif pref_mat_dict[staff][d][s] == 0:
-                        no_pref_count += 1
-                    elif pref_mat_dict[staff][d][s] < 0:
-                        print(date_arr[d], shift_arr[s], staff_arr[p])
-                        cant_count += 1
-
-    shift_stat_dict = {"RA": []}
-    for day_of_week in ["Weekday", "Weekend"]:
-        for shift_type in shift_arr:
-            shift_stat_dict[f"{day_of_week} - {shift_type}"] = []
-    shift_stat_dict["Total Shifts"] = []
-    print("Staff shift taking statistics: ")
-    for p, staff in enumerate(staff_arr):
-        print(f"{staff}: ")
-        print(f"\t#Total Shifts={total_shift_arr[p]}")
-        shift_stat_dict["RA"].append(staff)
-        shift_stat_dict["Total Shifts"].append(total_shift_arr[p])
-        for s in range(len(shift_arr)):
-            for key in staff_shift_arr[p][s]:
-                print(f"\t#{key} {shift_arr[s]}={staff_shift_arr[p][s][key]}")
-                shift_stat_dict[f"{key} - {shift_arr[s]}"].append(staff_shift_arr[p][s][key])
-        print()
-    print(f" - Number of wanted shifts requests met: {want_count}")
-    print(f" - Number of OK shifts met: {ok_count}")
-    print(f" - Number of no preference shifts met: {no_pref_count}")
-    print(f" - Number of cant shifts met: {cant_count}")
-    print(f" - Total number of shifts {total_count}")
-    return pd.DataFrame.from_dict(shift_stat_dict)
+    pref_tensor = as_pref_tensor(pref_tensor)
+    stats_df = get_schedule_stats_df(
+        solution_mat, pref_tensor, staff_arr, shift_arr, Calendar(date_arr, date_format)
+    )
+    shift_stats_df = stats_df.drop(columns=["Max Consecutive Shifts"] + PREF_COUNT_KEYS)
+    for p, d, s in get_cant_assignments(solution_mat, pref_tensor):
+        print(date_arr[d], shift_arr[s], staff_arr[p])
+    print_schedule_stats(shift_stats_df, shift_arr)
+    print(f" - Number of wanted shifts requests met: {stats_df['want_count'].sum()}")
+    print(f" - Number of OK shifts met: {stats_df['ok_count'].sum()}")
+    print(f" - Number of no preference shifts met: {stats_df['no_pref_count'].sum()}")
+    print(f" - Number of cant shifts met: {stats_df['cant_count'].sum()}")
+    print(f" - Total number of shifts {stats_df['Total Shifts'].sum()}")
+    return shift_stats_df
 
 
 # given the binary setting for 4 shifts, solve maximum
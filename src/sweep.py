@@ -0,0 +1,216 @@
+import argparse, os, copy, itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from ortools.sat.python import cp_model
+from args import get_main_args, get_shift_req_args, get_solver_args
+from main import parse_inputs
+from profiler import StageProfiler
+from data_process.utils import Calendar, get_solution_tensor
+from data_process.schedule_matrix import build_schedule_matrix
+from solver.ScheduleModeler import ScheduleModeler
+from solver.utils import get_solver_parameters, get_cp_solver
+
+# (column, True if higher is better) of the Pareto table
+PARETO_OBJECTIVES = [
+    ("pref_score", True), ("unavailable_count", False), ("fairness_spread", False),
+    ("solve_time", False)
+]
+
+# parsed inputs and calendar shared by every scenario of a sweep worker
+_sweep_state = {}
+
+
+def init_sweep_worker(args, input_dict) -> None:
+    """
+    Keep the parsed inputs of the sweep in the worker process, so they are
+    sent and set up once per worker instead of once per scenario.
+    """
+    _sweep_state["args"] = args
+    _sweep_state["input_dict"] = input_dict
+    _sweep_state["calendar"] = Calendar(
+        input_dict["date_list"], date_format=args.date_format, holidays=args.special_weekends
+    )
+
+
+def get_scenario_arr(args) -> list:
+    """
+    Return every combination of the sweep grids as a scenario dict.
+    """
+    grid_dict = {
+        "weekday_num_shifts": args.weekday_num_shifts_grid or [args.weekday_num_shifts],
+        "weekend_num_shifts": args.weekend_num_shifts_grid or [args.weekend_num_shifts],
+        "max_solve_time": args.max_solve_time_grid or [args.max_solve_time],
+        "negative_pref_weight": args.negative_pref_weight_grid or [args.negative_pref_weight],
+    }
+    return [
+        dict(zip(grid_dict.keys(), values)) for values in itertools.product(*grid_dict.values())
+    ]
+
+
+def run_scenario(scenario_idx: int, scenario: dict, num_workers: int,
+                 solution_dir: str) -> dict:
+    """
+    Solve one scenario with the shared inputs of the worker and return
+    its Pareto table record.
+    """
+    args, input_dict = _sweep_state["args"], _sweep_state["input_dict"]
+    calendar = _sweep_state["calendar"]
+    scenario_args = copy.copy(args)
+    scenario_args.weekday_num_shifts = scenario["weekday_num_shifts"]
+    scenario_args.weekend_num_shifts = scenario["weekend_num_shifts"]
+    shift_mat_df = build_schedule_matrix(scenario_args)
+    shift_mat = shift_mat_df[input_dict["shift_list"]].to_numpy().astype(bool)
+    pref_tensor = np.array(input_dict["pref_tensor"])
+    pref_tensor[:, ~shift_mat] = -2
+    staff_list = input_dict["staff_list"]
+
+    modeler = ScheduleModeler(
+        shift_mat_df=shift_mat_df, staff_list=staff_list, date_format=args.date_format,
+        pref_tensor=pref_tensor,
+        max_consecutive_dict={
+            staff: int(input_dict["max_consecutive_arr"][p]) for p, staff in enumerate(staff_list)
+        },
+        calendar=calendar, sparse=args.sparse_model,
+        max_consecutive_encoding=args.max_consecutive_encoding,
+        negative_pref_weight=scenario["negative_pref_weight"], verbose=False
+    )
+    model, shifts = modeler.get_model()
+    param_dict = get_solver_parameters(args)
+    param_dict["max_time_in_seconds"] = scenario["max_solve_time"]
+    param_dict["num_search_workers"] = num_workers
+    solver = get_cp_solver(param_dict)
+    status = solver.Solve(model)
+
+    record = {"scenario": scenario_idx, **scenario, "status": solver.StatusName(status),
+              "solve_time": solver.WallTime()}
+    if status not in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
+        return record
+    solution_mat = get_solution_tensor(solver, shifts, pref_tensor.shape)
+    np.save(os.path.join(solution_dir, f"scenario_{scenario_idx}.npy"), solution_mat)
+    assigned_mat = solution_mat > 0
+    total_arr = assigned_mat.sum(axis=(1, 2))
+    record.update({
+        "objective": solver.ObjectiveValue(),
+        "pref_score": int(pref_tensor[assigned_mat].sum()),
+        "unavailable_count": int((assigned_mat & (pref_tensor == -3)).sum()),
+        "negative_count": int((assigned_mat & (pref_tensor < 0)).sum()),
+        "fairness_spread": int(total_arr.max() - total_arr.min()),
+    })
+    return record
+
+
+def get_pareto_mask(sweep_df: pd.DataFrame) -> np.ndarray:
+    """
+    Return the mask of the solved scenarios that no other solved scenario
+    is at least as good as on every PARETO_OBJECTIVES and better on one.
+    """
+    solved_mask = sweep_df["status"].isin(["OPTIMAL", "FEASIBLE"]).to_numpy()
+    # negate the higher is better columns so lower is better on every column
+    score_mat = np.stack([
+        -sweep_df[column].to_numpy(dtype=float) if higher else sweep_df[column].to_numpy(dtype=float)
+        for column, higher in PARETO_OBJECTIVES
+    ], axis=1)[solved_mask]
+    dominated_arr = np.array([
+        np.any(np.all(score_mat <= score, axis=1) & np.any(score_mat < score, axis=1))
+        for score in score_mat
+    ], dtype=bool)
+    pareto_mask = np.zeros(len(sweep_df), dtype=bool)
+    pareto_mask[np.nonzero(solved_mask)[0]] = ~dominated_arr
+    return pareto_mask
+
+
+def run_sweep(args) -> pd.DataFrame:
+    data_dir = os.path.join(args.data_dir, args.data_name)
+    raw_data_dir = os.path.join(data_dir, "raw_data")
+    raw_data_url = os.path.join(raw_data_dir, args.raw_pref_file_name)
+    unavailable_day_url = os.path.join(raw_data_dir, args.unavailble_day_json_file_name)
+    assert os.path.isfile(raw_data_url), f"Raw preference file: {raw_data_url} not found"
+    assert os.path.isfile(unavailable_day_url), \
+        f"Unavailable day json file: {unavailable_day_url} not found"
+    solution_dir = os.path.join(data_dir, "solutions", "sweep")
+    if not os.path.exists(solution_dir):
+        os.makedirs(solution_dir)
+
+    # parse once with every shift existing, scenarios mask the non-existing ones
+    full_args = copy.copy(args)
+    full_args.weekday_num_shifts = args.max_num_shifts
+    full_args.weekend_num_shifts = args.max_num_shifts
+    input_dict = parse_inputs(
+        full_args, raw_data_url, unavailable_day_url, StageProfiler(enabled=False),
+        shift_mat_df=build_schedule_matrix(full_args)
+    )
+
+    scenario_arr = get_scenario_arr(args)
+    num_cores = args.num_cores if args.num_cores is not None else os.cpu_count()
+    max_parallel_scenarios = args.max_parallel_scenarios
+    if max_parallel_scenarios is None:
+        max_parallel_scenarios = min(len(scenario_arr), num_cores)
+    max_parallel_scenarios = max(1, min(max_parallel_scenarios, len(scenario_arr)))
+    num_workers = max(1, num_cores // max_parallel_scenarios)
+    print(f"Sweeping {len(scenario_arr)} scenarios, {max_parallel_scenarios} at a time "
+          f"with {num_workers} CP-SAT workers each")
+
+    record_arr = []
+    with ProcessPoolExecutor(
+        max_workers=max_parallel_scenarios, initializer=init_sweep_worker,
+        initargs=(args, input_dict)
+    ) as executor:
+        future_arr = [
+            executor.submit(run_scenario, scenario_idx, scenario, num_workers, solution_dir)
+            for scenario_idx, scenario in enumerate(scenario_arr)
+        ]
+        for future in as_completed(future_arr):
+            record = future.result()
+            print(f" - scenario {record['scenario']}: {record['status']} "
+                  f"({record['solve_time']:.1f}s)")
+            record_arr.append(record)
+
+    sweep_df = pd.DataFrame(record_arr).sort_values("scenario").reset_index(drop=True)
+    for column, _ in PARETO_OBJECTIVES:
+        if column not in sweep_df.columns:
+            sweep_df[column] = np.nan
+    sweep_df["pareto"] = get_pareto_mask(sweep_df)
+    sweep_url = os.path.join(solution_dir, args.sweep_file_name)
+    sweep_df.to_csv(sweep_url, index=False)
+    print(sweep_df.to_string(index=False))
+    print("Sweep table saved to {}".format(sweep_url))
+    return sweep_df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="scenario sweep flags")
+    get_main_args(parser)
+    get_shift_req_args(parser)
+    get_solver_args(parser)
+    parser.add_argument(
+        "--weekday_num_shifts_grid", type=int, nargs="+", default=None,
+        help="--weekday_num_shifts values to sweep"
+    )
+    parser.add_argument(
+        "--weekend_num_shifts_grid", type=int, nargs="+", default=None,
+        help="--weekend_num_shifts values to sweep"
+    )
+    parser.add_argument(
+        "--max_solve_time_grid", type=int, nargs="+", default=None,
+        help="--max_solve_time values to sweep"
+    )
+    parser.add_argument(
+        "--negative_pref_weight_grid", type=int, nargs="+", default=None,
+        help="--negative_pref_weight values to sweep"
+    )
+    parser.add_argument(
+        "--num_cores", type=int, default=None,
+        help="number of cores shared by all scenarios, default: all cores"
+    )
+    parser.add_argument(
+        "--max_parallel_scenarios", type=int, default=None,
+        help="max number of scenarios solved at the same time, default: one per core"
+    )
+    parser.add_argument(
+        "--sweep_file_name", type=str, default="sweep.csv",
+        help="name of the sweep table in the solutions/sweep directory"
+    )
+
+    args = parser.parse_args()
+    run_sweep(args)
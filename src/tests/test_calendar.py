@@ -0,0 +1,37 @@
+import os
+import numpy as np
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.utils import Calendar
+
+# Friday 3/25/22 - Monday 4/4/22
+DATE_LIST = [f"{month}/{day:02d}/22" for month, day in [
+    (3, 25), (3, 26), (3, 27), (3, 28), (3, 29), (3, 30), (3, 31),
+    (4, 1), (4, 2), (4, 3), (4, 4),
+]]
+
+
+def test_weekday_and_masks():
+    calendar = Calendar(DATE_LIST, "%m/%d/%y", holidays=["3/28/22"], excluded_dates=["04/04/22"])
+    assert len(calendar) == 11
+    assert calendar.weekday_arr.tolist() == [4, 5, 6, 0, 1, 2, 3, 4, 5, 6, 0]
+    assert np.flatnonzero(calendar.weekend_mask).tolist() == [1, 2, 8, 9]
+    assert np.flatnonzero(calendar.friday_saturday_mask).tolist() == [0, 1, 7, 8]
+    assert np.flatnonzero(calendar.holiday_mask).tolist() == [3]
+    assert np.flatnonzero(calendar.excluded_mask).tolist() == [10]
+    assert calendar.get_day_of_week_str(0) == "Friday"
+
+
+def test_get_date_idx():
+    calendar = Calendar(DATE_LIST, "%m/%d/%y")
+    assert calendar.get_date_idx("03/27/22") == 2
+    # the same day in another spelling of the format
+    assert calendar.get_date_idx("3/27/22") == 2
+    assert calendar.get_date_idx("05/01/22") == -1
+    assert calendar.contains("4/4/22")
+    assert not calendar.contains("3/24/22")
+
+
+def test_masks_are_read_only():
+    calendar = Calendar(DATE_LIST, "%m/%d/%y")
+    for arr in [calendar.weekday_arr, calendar.weekend_mask, calendar.holiday_mask]:
+        assert not arr.flags.writeable
@@ -0,0 +1,60 @@
+import os, time
+import numpy as np
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.input_cache import InputCache
+
+
+def get_input_dict(num_days: int=3) -> dict:
+    return {
+        "shift_mat": np.ones((num_days, 2), dtype=np.int64),
+        "pref_tensor": np.zeros((2, num_days, 2), dtype=np.int8),
+        "max_consecutive_arr": np.array([3, 4]),
+        "unavailable_mask": np.zeros((2, num_days, 2), dtype=bool),
+        "date_list": [f"03/{27 + d}/22" for d in range(num_days)],
+        "shift_list": ["Primary", "Secondary"],
+        "staff_list": ["Alice", "Bob"],
+    }
+
+
+def test_key_depends_on_file_content_and_args(tmp_path):
+    cache = InputCache(str(tmp_path / "cache"))
+    raw_url = tmp_path / "raw.csv"
+    raw_url.write_text("Name\nAlice\n")
+    key = cache.get_key([str(raw_url)], {"start_date": "3/27/22"})
+    assert key == cache.get_key([str(raw_url)], {"start_date": "3/27/22"})
+    assert key != cache.get_key([str(raw_url)], {"start_date": "3/28/22"})
+    # a missing file is part of the key, not an error
+    assert key != cache.get_key([str(raw_url), str(tmp_path / "missing.json")],
+                                {"start_date": "3/27/22"})
+    raw_url.write_text("Name\nBob\n")
+    assert key != cache.get_key([str(raw_url)], {"start_date": "3/27/22"})
+
+
+def test_save_and_load(tmp_path):
+    cache = InputCache(str(tmp_path / "cache"))
+    assert cache.load("missing") is None
+    input_dict = get_input_dict()
+    cache.save("key", input_dict)
+    cached_dict = cache.load("key", mmap_mode="r")
+    for key, value in input_dict.items():
+        assert np.array_equal(np.asarray(cached_dict[key]), np.asarray(value))
+    assert isinstance(cached_dict["pref_tensor"], np.memmap)
+    assert cached_dict["pref_tensor"].dtype == np.int8
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = InputCache(str(tmp_path / "cache"))
+    for key in ["a", "b"]:
+        cache.save(key, get_input_dict(num_days=1000))
+    entry_size = sum(
+        os.path.getsize(os.path.join(cache.cache_dir, "a", file_name))
+        for file_name in os.listdir(os.path.join(cache.cache_dir, "a"))
+    )
+    # "a" is used after "b", so "b" goes first once only 2 entries fit
+    past_time = time.time() - 100
+    os.utime(os.path.join(cache.cache_dir, "a"), (past_time, past_time))
+    os.utime(os.path.join(cache.cache_dir, "b"), (past_time - 10, past_time - 10))
+    cache.load("a")
+    cache.max_size_mb = 2.5 * entry_size / 1024 ** 2
+    cache.save("c", get_input_dict(num_days=1000))
+    assert sorted(os.listdir(cache.cache_dir)) == ["a", "c"]
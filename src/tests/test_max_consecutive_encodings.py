@@ -0,0 +1,108 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from ortools.sat.python import cp_model
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.utils import get_date_arr, get_max_consecutive_len
+from solver.ScheduleModeler import ScheduleModeler
+
+ENCODINGS = ["window", "prefix", "automaton"]
+STAFF_LIST = ["Alice", "Bob", "Carol"]
+MAX_CONSECUTIVE_DICT = {"Alice": 1, "Bob": 2, "Carol": 3}
+
+
+class ScheduleCollector(cp_model.CpSolverSolutionCallback):
+    """
+    Collect the shift variable values of every enumerated solution.
+    """
+    def __init__(self, shift_vars: dict):
+        cp_model.CpSolverSolutionCallback.__init__(self)
+        self.shift_vars = shift_vars
+        self.schedule_set = set()
+
+    def on_solution_callback(self):
+        self.schedule_set.add(tuple(
+            self.Value(shift_var) for _, shift_var in sorted(self.shift_vars.items())
+        ))
+
+
+def get_schedule_set(encoding: str, prev_work_mat: np.ndarray=None) -> set:
+    """
+    Return every feasible schedule of 3 staffs over one shift a day for
+    Monday 3/28/22 - Sunday 4/3/22.
+    """
+    shift_mat_df = pd.DataFrame({
+        "date": ["03/28/22", "03/29/22", "03/30/22", "03/31/22", "04/01/22", "04/02/22", "04/03/22"],
+        "Primary": [1] * 7,
+    })
+    modeler = ScheduleModeler(
+        shift_mat_df, STAFF_LIST, "%m/%d/%y", max_consecutive_dict=MAX_CONSECUTIVE_DICT,
+        max_consecutive_encoding=encoding, prev_work_mat=prev_work_mat, verbose=False
+    )
+    model, shift_vars = modeler.get_model()
+    solver = cp_model.CpSolver()
+    solver.parameters.enumerate_all_solutions = True
+    solver.parameters.num_workers = 1
+    collector = ScheduleCollector(shift_vars)
+    assert solver.Solve(model, collector) == cp_model.OPTIMAL
+    return collector.schedule_set
+
+
+def get_random_instance(num_staffs: int, num_days: int, num_shifts: int, seed: int) -> dict:
+    """
+    Return a seeded instance with every shift existing on every day from
+    1/2/22 and random preferences and max consecutive days.
+    """
+    rng = np.random.default_rng(seed)
+    date_list = get_date_arr("01/02/22", f"01/{num_days + 1:02d}/22")
+    shift_mat_df = pd.DataFrame({"date": date_list})
+    for s in range(num_shifts):
+        shift_mat_df[f"Shift {s + 1}"] = 1
+    staff_list = [f"Staff {p + 1}" for p in range(num_staffs)]
+    return {
+        "shift_mat_df": shift_mat_df,
+        "staff_list": staff_list,
+        "pref_tensor": rng.integers(-2, 3, size=(num_staffs, num_days, num_shifts)),
+        "max_consecutive_dict": {
+            staff: int(max_consecutive) for staff, max_consecutive in
+            zip(staff_list, rng.choice([2, 3, 4, 5], size=num_staffs))
+        },
+    }
+
+
+@pytest.mark.parametrize("prev_work_mat", [
+    None,
+    # Bob and Carol worked the last 2 days before the schedule
+    np.array([[0, 0, 0], [0, 1, 1], [1, 1, 1]], dtype=bool),
+])
+def test_encodings_have_the_same_feasible_schedules(prev_work_mat):
+    window_schedule_set = get_schedule_set("window", prev_work_mat)
+    assert len(window_schedule_set) > 0
+    for encoding in ["prefix", "automaton"]:
+        assert get_schedule_set(encoding, prev_work_mat) == window_schedule_set
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_encodings_have_the_same_optimum(seed):
+    instance = get_random_instance(6, 21, 2, seed)
+    objective_arr = []
+    for encoding in ENCODINGS:
+        modeler = ScheduleModeler(
+            instance["shift_mat_df"], instance["staff_list"], "%m/%d/%y",
+            pref_tensor=instance["pref_tensor"],
+            max_consecutive_dict=instance["max_consecutive_dict"],
+            max_consecutive_encoding=encoding, verbose=False
+        )
+        model, shift_vars = modeler.get_model()
+        solver = cp_model.CpSolver()
+        solver.parameters.num_workers = 8
+        solver.parameters.max_time_in_seconds = 60
+        assert solver.Solve(model) == cp_model.OPTIMAL
+        objective_arr.append(solver.ObjectiveValue())
+        for p, staff in enumerate(instance["staff_list"]):
+            work_arr = [
+                any(solver.Value(shift_vars[(p, d, s)]) for s in range(2)) for d in range(21)
+            ]
+            assert get_max_consecutive_len(work_arr) <= instance["max_consecutive_dict"][staff]
+    assert objective_arr[1:] == objective_arr[:-1]
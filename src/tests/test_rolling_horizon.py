@@ -0,0 +1,41 @@
+import os
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from benchmark.synthetic import generate_instance
+from data_process.utils import Calendar
+from data_process.schedule_verifier import ScheduleVerifier
+from solver.RollingHorizonSolver import RollingHorizonSolver
+
+
+def get_rolling_solver(instance: dict, window_days: int, overlap_days: int) -> RollingHorizonSolver:
+    return RollingHorizonSolver(
+        instance["shift_mat_df"], instance["staff_list"], instance["date_format"],
+        pref_tensor=instance["pref_tensor"],
+        max_consecutive_dict=instance["max_consecutive_dict"],
+        window_days=window_days, overlap_days=overlap_days,
+        solver_param_dict={"num_workers": 8, "max_time_in_seconds": 120}
+    )
+
+
+def test_short_last_window_is_merged():
+    instance = generate_instance(4, 45, 2, seed=0)
+    assert get_rolling_solver(instance, 28, 7).get_windows() == [(0, 45, 45)]
+    assert get_rolling_solver(instance, 20, 5).get_windows() == [(0, 20, 15), (15, 45, 45)]
+    assert get_rolling_solver(instance, 10, 0).get_windows() == [
+        (0, 10, 10), (10, 20, 20), (20, 30, 30), (30, 45, 45)
+    ]
+    assert get_rolling_solver(instance, 24, 3).get_windows() == [(0, 24, 21), (21, 45, 45)]
+
+
+def test_windows_meet_the_fairness_bounds_of_the_whole_schedule():
+    instance = generate_instance(12, 120, 3, seed=2)
+    rolling_solver = get_rolling_solver(instance, 28, 7)
+    solution_mat = rolling_solver.solve()
+    assert rolling_solver.get_status_name() == "FEASIBLE"
+    assert len(rolling_solver.status_list) == len(rolling_solver.get_windows())
+    verifier = ScheduleVerifier(
+        instance["staff_list"], instance["shift_list"],
+        Calendar(instance["date_list"], instance["date_format"]),
+        max_consecutive_dict=instance["max_consecutive_dict"],
+        shift_mat=instance["shift_mat_df"][instance["shift_list"]].to_numpy()
+    )
+    assert verifier.verify(solution_mat) == []
@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import pytest
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.utils import Calendar, get_run_length_mat, get_max_consecutive_len
+from data_process.schedule_verifier import ScheduleVerifier
+
+# Monday 3/28/22 - Sunday 4/3/22
+DATE_LIST = ["03/28/22", "03/29/22", "03/30/22", "03/31/22", "04/01/22", "04/02/22", "04/03/22"]
+STAFF_LIST = ["Alice", "Bob"]
+SHIFT_LIST = ["Primary"]
+
+
+def test_get_run_length_mat():
+    assert get_run_length_mat([[1, 1, 0, 1]]).tolist() == [[1, 2, 0, 1]]
+    assert get_run_length_mat([[0, 0], [3, 1]]).tolist() == [[0, 0], [1, 2]]
+    assert get_run_length_mat(np.zeros((2, 0))).shape == (2, 0)
+
+
+def test_get_run_length_mat_matches_loop():
+    rng = np.random.default_rng(0)
+    work_mat = rng.integers(0, 2, size=(20, 50))
+    run_length_mat = get_run_length_mat(work_mat)
+    for p in range(len(work_mat)):
+        assert run_length_mat[p].max() == get_max_consecutive_len(work_mat[p])
+
+
+@pytest.fixture
+def verifier():
+    # Alice is unavailable on Wednesday, Bob works at most 2 days in a row
+    unavailable_mask = np.zeros((2, 7, 1), dtype=bool)
+    unavailable_mask[0, 2] = True
+    return ScheduleVerifier(
+        STAFF_LIST, SHIFT_LIST, Calendar(DATE_LIST, "%m/%d/%y"),
+        unavailable_mask=unavailable_mask, max_consecutive_dict={"Alice": 7, "Bob": 2},
+        shift_mat=np.ones((7, 1), dtype=int)
+    )
+
+
+def get_solution_mat(staff_idx_arr) -> np.ndarray:
+    """
+    Return the solution tensor of the staff index of every day.
+    """
+    solution_mat = np.zeros((2, len(staff_idx_arr), 1), dtype=np.int8)
+    solution_mat[staff_idx_arr, np.arange(len(staff_idx_arr)), 0] = 1
+    return solution_mat
+
+
+def test_valid_schedule(verifier):
+    # Friday & Saturday are one weekend shift each, weekdays 3 - 2
+    assert verifier.verify(get_solution_mat([0, 1, 1, 0, 0, 1, 0])) == []
+
+
+def test_violations(verifier):
+    solution_mat = get_solution_mat([0, 1, 0, 1, 1, 1, 0])
+    # a second staff on Monday, nobody on Tuesday
+    solution_mat[1, 0, 0] = 1
+    solution_mat[1, 1, 0] = 0
+    violation_arr = verifier.verify(solution_mat)
+    type_arr = [violation["type"] for violation in violation_arr]
+    assert type_arr.count("staff_per_shift") == 2
+    assert {"staff_per_shift", "unavailable", "max_consecutive", "fairness"} == set(type_arr)
+    unavailable = violation_arr[type_arr.index("unavailable")]
+    assert (unavailable["staff"], unavailable["date"]) == ("Alice", "03/30/22")
+    max_consecutive = violation_arr[type_arr.index("max_consecutive")]
+    assert (max_consecutive["staff"], max_consecutive["value"]) == ("Bob", 3)
+    assert all(violation["message"] for violation in violation_arr)
+
+
+def test_shape_mismatch(verifier):
+    with pytest.raises(AssertionError):
+        verifier.verify(np.zeros((2, 6, 1), dtype=np.int8))
@@ -0,0 +1,24 @@
+import os, threading
+import pytest
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from service import ScheduleService
+
+
+def test_dependent_job_with_one_worker(tmp_path):
+    service = ScheduleService({"data_dir": str(tmp_path)}, max_parallel_jobs=1)
+    # keep the only worker busy so the solution job stays queued
+    release_event = threading.Event()
+    service.executor.submit(release_event.wait)
+    try:
+        solution_job = service.submit("solve", {"data_name": "missing"})
+        with pytest.raises(AssertionError, match="is QUEUED"):
+            service.submit("verify", {"data_name": "missing"}, solution_job=solution_job.job_id)
+        release_event.set()
+        service.future_dict[solution_job.job_id].result(timeout=30)
+        assert solution_job.status == "ERROR"
+        job = service.submit("verify", {"data_name": "missing"}, solution_job=solution_job.job_id)
+        service.future_dict[job.job_id].result(timeout=30)
+        assert job.status == "ERROR"
+    finally:
+        release_event.set()
+        service.shutdown()
@@ -0,0 +1,26 @@
+import os
+import numpy as np
+from ortools.sat.python import cp_model
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.utils import get_solution_tensor
+from solver.IncumbentRecorder import IncumbentRecorder
+
+
+def test_incumbent_matches_solution_tensor():
+    # 2 staffs x 3 days x 1 shift, Alice's Tuesday cell is pruned to 0
+    model = cp_model.CpModel()
+    shift_vars = {}
+    for p in range(2):
+        for d in range(3):
+            shift_vars[(p, d, 0)] = model.NewBoolVar(f"shift_p{p}d{d}s0")
+    shift_vars[(0, 1, 0)] = 0
+    for d in range(3):
+        model.Add(sum(shift_vars[(p, d, 0)] for p in range(2)) == 1)
+    model.Maximize(shift_vars[(0, 0, 0)] + shift_vars[(0, 2, 0)])
+    recorder = IncumbentRecorder(shift_vars, (2, 3, 1))
+    solver = cp_model.CpSolver()
+    assert solver.Solve(model, recorder) == cp_model.OPTIMAL
+    solution_mat = get_solution_tensor(solver, shift_vars, (2, 3, 1))
+    assert solution_mat[:, :, 0].tolist() == [[1, 0, 1], [0, 1, 0]]
+    assert np.array_equal(recorder.solution_mat, solution_mat)
+    assert len(recorder.incumbent_arr) > 0
@@ -0,0 +1,38 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from ortools.sat.python import cp_model
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from solver.ScheduleModeler import ScheduleModeler
+
+STAFF_LIST = ["Alice", "Bob"]
+
+
+def get_modeler(pref_tensor: np.ndarray) -> ScheduleModeler:
+    """
+    Return the sparse modeler of one shift a day for Monday 3/28/22 -
+    Wednesday 3/30/22.
+    """
+    shift_mat_df = pd.DataFrame({"date": ["03/28/22", "03/29/22", "03/30/22"], "Primary": [1] * 3})
+    return ScheduleModeler(
+        shift_mat_df, STAFF_LIST, "%m/%d/%y", pref_tensor=pref_tensor,
+        sparse=True, verbose=False
+    )
+
+
+def test_unavailable_cells_are_pruned():
+    pref_tensor = np.zeros((2, 3, 1), dtype=np.int8)
+    pref_tensor[0, 1] = -3
+    model, shift_vars = get_modeler(pref_tensor).get_model()
+    solver = cp_model.CpSolver()
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    assert solver.Value(shift_vars[(0, 1, 0)]) == 0
+    assert solver.Value(shift_vars[(1, 1, 0)]) == 1
+
+
+def test_shift_without_available_staff():
+    pref_tensor = np.zeros((2, 3, 1), dtype=np.int8)
+    pref_tensor[:, 1] = -3
+    with pytest.raises(ValueError, match="No available staff for 03/29/22 Primary"):
+        get_modeler(pref_tensor).get_model()
@@ -0,0 +1,71 @@
+import os, json
+import numpy as np
+import pytest
+os.sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from data_process.utils import Calendar, get_unavailable_mask, load_unavailable_mask
+
+# Sunday 3/27/22 - Saturday 4/9/22
+DATE_LIST = [f"{month:02d}/{day:02d}/22" for month, day in
+             [(3, d) for d in range(27, 32)] + [(4, d) for d in range(1, 10)]]
+STAFF_LIST = ["Alice", "Bob"]
+SHIFT_LIST = ["Primary", "Secondary"]
+
+
+@pytest.fixture
+def calendar():
+    return Calendar(DATE_LIST, "%m/%d/%y")
+
+
+def test_date_and_all_keys(calendar):
+    unavailable_mask = get_unavailable_mask(
+        {"Alice": {"03/29/22": ["Secondary"], "04/01/22": "ALL"}},
+        STAFF_LIST, SHIFT_LIST, calendar
+    )
+    assert unavailable_mask.shape == (2, 14, 2)
+    assert np.argwhere(unavailable_mask).tolist() == [[0, 2, 1], [0, 5, 0], [0, 5, 1]]
+
+
+def test_day_of_week_key_overrides_date_key(calendar):
+    # Monday 3/28/22 and 4/4/22; the Monday key wins whatever the dict order
+    for unavailable_dict in [
+        {"03/28/22": "ALL", "Monday": ["Primary"]},
+        {"Monday": ["Primary"], "03/28/22": "ALL"},
+    ]:
+        unavailable_mask = get_unavailable_mask(
+            {"Bob": unavailable_dict}, STAFF_LIST, SHIFT_LIST, calendar
+        )
+        assert not unavailable_mask[0].any()
+        assert np.argwhere(unavailable_mask[1]).tolist() == [[1, 0], [8, 0]]
+
+
+def test_date_in_another_spelling(calendar):
+    unavailable_mask = get_unavailable_mask(
+        {"Alice": {"4/1/22": ["Primary"]}}, STAFF_LIST, SHIFT_LIST, calendar
+    )
+    assert np.argwhere(unavailable_mask).tolist() == [[0, 5, 0]]
+
+
+def test_dates_outside_calendar(calendar, capsys):
+    unavailable_dict = {"Alice": {"05/01/22": "ALL"}}
+    unavailable_mask = get_unavailable_mask(unavailable_dict, STAFF_LIST, SHIFT_LIST, calendar)
+    assert not unavailable_mask.any()
+    assert "05/01/22" in capsys.readouterr().out
+    with pytest.raises(AssertionError, match="not in the schedule"):
+        get_unavailable_mask(unavailable_dict, STAFF_LIST, SHIFT_LIST, calendar, strict=True)
+
+
+def test_invalid_entries(calendar):
+    with pytest.raises(AssertionError):
+        get_unavailable_mask({"Carol": {"Monday": "ALL"}}, STAFF_LIST, SHIFT_LIST, calendar)
+    with pytest.raises(AssertionError):
+        get_unavailable_mask({"Alice": {"Monday": ["Night"]}}, STAFF_LIST, SHIFT_LIST, calendar)
+    with pytest.raises(AssertionError):
+        get_unavailable_mask({"Alice": {"Someday": "ALL"}}, STAFF_LIST, SHIFT_LIST, calendar)
+
+
+def test_load_unavailable_mask(calendar, tmp_path):
+    assert not load_unavailable_mask(None, STAFF_LIST, SHIFT_LIST, calendar).any()
+    json_url = tmp_path / "staff_unavailable_days.json"
+    json_url.write_text(json.dumps({"Alice": {"Saturday": "ALL"}}))
+    unavailable_mask = load_unavailable_mask(str(json_url), STAFF_LIST, SHIFT_LIST, calendar)
+    assert np.flatnonzero(unavailable_mask[0].all(axis=1)).tolist() == [6, 13]